@@ -1 +1,25 @@
-from .render import MovieRenderer, ImagePipeline, SingleImage, CompositeRGBImage
+import importlib
+
+# exported names and the modules defining them, which are only imported on first access so that importing the package
+# (e.g. by the command line interface) doesn't load the rendering stack
+_exports = {
+    'MovieRenderer':     '.render',
+    'ImagePipeline':     '.render',
+    'SingleImage':       '.render',
+    'CompositeRGBImage': '.render',
+    'LUTCompositeImage': '.render',
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,10 +1,36 @@
+import copy
+import math
 import os
+from functools import partial
 from pathlib import Path
+from typing import List
 
-from fileops.export.config import ConfigMovie
+from fileops.export.config import ConfigMovie, read_config_movie
 from fileops.logger import get_logger
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
-from movierender.render import MovieRenderer
+from movierender.render import MovieRenderer, ParallelMovieRenderer, RasterMovieRenderer, CompositeRGBImage, \
+    LUTCompositeImage, Profiler, read_encoder_settings, segment_filename
+
+# width and height in pixels of the frames of each target resolution of the movies
+RESOLUTIONS = {
+    '720p':  (1280, 720),
+    '1080p': (1920, 1080),
+    '4k':    (3840, 2160),
+}
+
+
+def _layout_in_worker(composer: 'BaseLayoutComposer'):
+    # the composer arrives unpickled in the worker process, so the layout is built again with a renderer of its own
+    composer.make_layout()
+    return composer.renderer
+
+
+def _layout_in_thread(composer: 'BaseLayoutComposer'):
+    # threads share the composer, so each one builds the layout on a copy that reads the movie configuration again
+    return _layout_in_worker(copy.copy(composer))
 
 
 class BaseLayoutComposer:
@@ -13,11 +39,45 @@ class BaseLayoutComposer:
     def __init__(self, movie: ConfigMovie,
                  prefix='', suffix='',
                  overwrite=False,
+                 workers=1,
+                 threads=False,
+                 retained=False,
+                 intensity_range='frame',
+                 lut=False,
+                 backend='matplotlib',
+                 cache_frames=False,
+                 profile=None,
+                 resolution=None,
+                 encoder: dict = None,
+                 frames: List[int] = None,
                  **kwargs):
         self._overwrite = overwrite
         self._movie_configuration_params = movie
         self.renderer: MovieRenderer | None = None
+        self.workers = workers
+        self.threads = threads  # workers render frames in threads of this process instead of processes
+        # draw the layout once and only update images and dynamic overlays on every frame (see SequentialMovieRenderer)
+        self.retained = retained
+        self.intensity_range = intensity_range  # either 'frame', 'smooth' or 'movie' (see IntensityRange)
+        # integer images are composited through per-channel lookup tables (see LUTCompositeImage)
+        self.composite_pipeline = LUTCompositeImage if lut else CompositeRGBImage
+        # layouts of images, scale bars, timestamps and text can be drawn without matplotlib (see RasterMovieRenderer)
+        assert backend in ('matplotlib', 'raster'), f"Rendering backend {backend} not supported."
+        self.backend = backend
+        # if given as 'json' or 'csv', a report of the time spent per stage of rendering is written next to the movie
+        assert profile in (None, 'json', 'csv'), f"Profile format {profile} not supported."
+        self.profile = profile
+        self.cache_frames = cache_frames  # reuse frames rendered before with the same configuration (see FrameCache)
+        # frames are rasterized to fit a target resolution (e.g. '1080p'), or with one pixel of the figure per pixel of
+        # the images if 'native'; if not given, figures are rasterized at a fixed dpi
+        assert resolution in (None, 'native', *RESOLUTIONS), f"Resolution {resolution} not supported."
+        self.resolution = resolution
         self.dpi = 326
+        self.downsample = 1  # factor by which image planes are averaged before being drawn (see ImagePipeline)
+        # settings of the encoder given in the configuration file, overridden by those given as encoder
+        self.encoder = read_encoder_settings(movie).updated(**(encoder if encoder is not None else dict()))
+        # if given, only these frames are rendered, into a segment of the movie named after them (see concat_segments)
+        self.frames = frames
 
         self.fig_title = movie.title
         self.ax_lst = list()
@@ -27,9 +87,12 @@ class BaseLayoutComposer:
         self.filename = prefix + fname
         if len(suffix) > 0:
             self.filename += "." + suffix
-        self.filename += ".mp4"
+        self.filename += self.encoder.extension
         self.base_folder = movie.configfile.parent
         self.save_file_path = Path(self.base_folder) / self.filename
+        if frames is not None:
+            self.save_file_path = segment_filename(self.save_file_path, frames)
+            self.filename = self.save_file_path.name
 
         if os.path.exists(self.save_file_path):
             if os.path.getsize(self.save_file_path) < 300:  # if size is too small, treat it as if the file didn't exist
@@ -38,11 +101,104 @@ class BaseLayoutComposer:
                 self.log.warning(f'File {self.filename} already exists in folder {self.base_folder}.')
                 raise FileExistsError
 
+    def __getstate__(self):
+        # image files keep open handles, so only the location of the movie configuration is pickled
+        state = self.__dict__.copy()
+        movie = self._movie_configuration_params
+        state.update({
+            '_movie_configuration_params': (movie.configfile, movie.header),
+            'renderer':                    None,
+            'ax_lst':                      list(),
+        })
+        return state
+
+    def __setstate__(self, state):
+        configfile, header = state['_movie_configuration_params']
+        movies = [m for m in read_config_movie(configfile) if m.header == header]
+        assert len(movies) == 1, f"Movie {header} not found in configuration file {configfile}."
+        state.update({
+            '_movie_configuration_params': movies[0],
+            'workers':                     1,
+        })
+        self.__dict__.update(state)
+
     def make_layout(self):
         raise NotImplementedError
 
+    def make_figure(self, figsize) -> Figure:
+        """
+        Create the figure of the layout with the dpi that fits the target resolution. The dpi of movies at native
+        resolution, and how much image planes are downsampled, depend on the axes the images are drawn in, and are
+        set once those are laid out (see fit_axes).
+        """
+        fig_w, fig_h = figsize
+        if self.resolution in (None, 'native'):
+            dpi = self.dpi
+        else:
+            width, height = RESOLUTIONS[self.resolution]
+            dpi = max(1., math.floor(min(width / fig_w, height / fig_h)))
+        # figures are drawn by their own canvas, so they are never registered with pyplot
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def fit_axes(self, fig: Figure, axes: List[Axes]):
+        """
+        Fit the figure to the axes where images are drawn, as they are placed in the figure by the layout: at native
+        resolution, the dpi is set so that there is at least one pixel of the movie per pixel of the images; otherwise
+        image planes larger than their axes are downsampled to about the size of the axes, as the encoded movie can't
+        keep more pixels than that.
+        """
+        if self.resolution is None:
+            return
+        im = self._movie_configuration_params.image_file
+        fig_w, fig_h = fig.get_size_inches()
+        # images keep their aspect ratio, so they are as large as the tighter side of the smallest axes allows
+        inch_per_px = min(min(ax.get_position().width * fig_w / im.width, ax.get_position().height * fig_h / im.height)
+                          for ax in axes)
+        if self.resolution == 'native':
+            fig.set_dpi(math.ceil(1 / inch_per_px))
+        else:
+            self.downsample = max(1, math.floor(1 / (inch_per_px * fig.dpi)))
+        self.log.debug(f"Figure of {fig_w * fig.dpi:.0f}x{fig_h * fig.dpi:.0f} pixels at {fig.dpi} dpi, "
+                       f"planes downsampled by {self.downsample}.")
+
+    def raster_downsampling(self, columns=1, rows=1) -> int:
+        # tiles of the raster backend are as large as the images, so they are downsampled to fit the resolution
+        if self.resolution in (None, 'native'):
+            return 1
+        im = self._movie_configuration_params.image_file
+        width, height = RESOLUTIONS[self.resolution]
+        return max(1, math.ceil(max(columns * im.width / width, rows * im.height / height)))
+
+    def make_renderer(self, fig: Figure, **kwargs) -> MovieRenderer:
+        movie = self._movie_configuration_params
+        if self.workers > 1:
+            layout_factory = partial(_layout_in_thread if self.threads else _layout_in_worker, self)
+            return ParallelMovieRenderer(fig=fig, config=movie,
+                                         layout_factory=layout_factory,
+                                         workers=self.workers,
+                                         threads=self.threads,
+                                         retained=self.retained,
+                                         encoder=self.encoder,
+                                         **kwargs)
+        return MovieRenderer(fig=fig, config=movie, retained=self.retained, encoder=self.encoder, **kwargs)
+
+    def make_raster_renderer(self, n_tiles=1, columns=1, **kwargs) -> RasterMovieRenderer:
+        if self.workers > 1:
+            self.log.info("Frames of the raster backend are rendered in a single process.")
+        self.downsample = self.raster_downsampling(columns=columns, rows=math.ceil(n_tiles / columns))
+        return RasterMovieRenderer(config=self._movie_configuration_params, n_tiles=n_tiles, columns=columns,
+                                   title=self.fig_title, downsample=self.downsample, encoder=self.encoder, **kwargs)
+
     def render(self):
         self.log.info(f"Rendering movie into file {self.save_file_path}.")
         if self.renderer is None:
             raise AttributeError("Need to call method make_layout before trying to render.")
-        self.renderer.render(filename=str(self.save_file_path), test=False)
+        if self.profile is not None:
+            self.renderer.profiler = Profiler()
+        self.renderer.render(filename=str(self.save_file_path), test=False, cache_frames=self.cache_frames,
+                             frames=self.frames)
+        if self.profile is not None:
+            self.renderer.profiler.write(self.save_file_path.with_name(f"{self.filename}.profile.{self.profile}"))
+            self.renderer.profiler.log_summary()
@@ -1,47 +1,132 @@
+from __future__ import annotations
+
+import importlib
 import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, NamedTuple, Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
 import skimage
-from fileops.export.config import ConfigPanel
-from fileops.image.ops import z_projection
+from fileops.export.config import ConfigPanel, read_config_panel
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from skimage.exposure import exposure
 
 import movierender.overlays as ovl
 from movierender.overlays import PixelTools
+from movierender.render.pipelines import cached_z_projection
 
 logger = logging.getLogger(__name__)
 
+HISTOGRAM_BINS = 50
+
+
+class PanelTile(NamedTuple):
+    frame: int
+    channel: int
+    image: np.ndarray  # ready to be drawn by imshow, either gray or RGB
+    histogram: Tuple[np.ndarray, np.ndarray] | None = None  # counts and bin edges, if the channel overlays one
 
-def plotimg(data, panel=None, **kwargs):
+
+def prepare_tile(panel: ConfigPanel, frame: int, channel: int) -> PanelTile:
+    """
+    Compute the image of a tile of the panel: the z-projection of the frame and channel, rescaled and colored as set
+    in the configuration of the channel, along with its histogram.
+    """
+    imf = panel.image_file
+    img = cached_z_projection(imf, frame, channel, projection='all-max')
+
+    histogram = None
+    imgf = skimage.util.img_as_float(img.image)
+    if f"channel-{channel}" in panel.channel_render_parameters:
+        ch_par = panel.channel_render_parameters[f"channel-{channel}"]
+        if "overlays" in ch_par and "histogram" in ch_par["overlays"]:
+            histogram = np.histogram(img.image.ravel(), bins=HISTOGRAM_BINS)
+        if "color" in ch_par:
+            imgf = exposure.rescale_intensity(imgf, in_range=tuple(np.percentile(imgf, (2, 99))), out_range=(0, 0.85))
+            imgf = np.stack((imgf,) * 3, axis=-1) * ch_par["color"][1:4]
+
+    # single precision is enough for display, and halves what workers send back
+    return PanelTile(frame, channel, imgf.astype(np.float32), histogram)
+
+
+# panel read by each worker process, as image files can't be sent between processes
+_worker_panel: ConfigPanel | None = None
+
+
+def _init_worker(configfile: Path, header: str, loader_module: str):
+    global _worker_panel
+    # loader classes given in configuration files are looked up as attributes of their package, so that of the panel
+    # has to be imported, as it may not be imported along with fileops (e.g. loaders of other packages)
+    importlib.import_module(loader_module)
+    panels = [p for p in read_config_panel(configfile) if p.header == header]
+    assert len(panels) == 1, f"Panel {header} not found in configuration file {configfile}."
+    _worker_panel = panels[0]
+
+
+def _prepare_tile_in_worker(frame: int, channel: int) -> PanelTile:
+    return prepare_tile(_worker_panel, frame, channel)
+
+
+def prepare_tiles(panel: ConfigPanel, keys, workers=1) -> Dict[Tuple[int, int], PanelTile]:
+    """
+    Prepare the tiles of the given (frame, channel) keys, across a pool of processes if workers > 1.
+    """
+    keys = list(dict.fromkeys(keys))
+    workers = min(workers, os.cpu_count() or 1)
+    if workers <= 1 or len(keys) <= 1:
+        return {(fr, ch): prepare_tile(panel, fr, ch) for fr, ch in keys}
+
+    logger.info(f"Preparing {len(keys)} tiles of panel {panel.header} with {workers} processes.")
+    with ProcessPoolExecutor(max_workers=min(workers, len(keys)),
+                             mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(panel.configfile, panel.header, type(panel.image_file).__module__)) as executor:
+        futures = {key: executor.submit(_prepare_tile_in_worker, *key) for key in keys}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def plan_panel(panel: ConfigPanel) -> pd.DataFrame:
+    """
+    Plan the images of the panel: one row per frame and channel, which are the facets of the montage, along with the
+    number of focal planes projected into it. Each row is a single image request, so that projections are computed
+    once and shared by every overlay of the tile.
+    """
+    return pd.DataFrame([
+        {
+            'frame':     f,
+            'channel':   ch,
+            'n_zstacks': len(panel.zstacks)
+        }
+        for ch in panel.channels
+        for f in panel.frames
+    ])
+
+
+def plotimg(data, ax: Axes, panel=None, tiles: Dict[Tuple[int, int], PanelTile] = None, **kwargs):
     imf = panel.image_file
     t = PixelTools(imf)
 
-    ax = plt.gca()
     ax.cla()
 
     w_um, h_um = imf.width * imf.um_per_pix, imf.height * imf.um_per_pix
     sbar = ovl.ScaleBar(um=panel.scalebar, lw=3, xy=t.xy_ratio_to_um(0.05, 0.9), fontdict={'size': 9})
-    hst = ovl.ImageHistogram(ax=ax, bins=50, color='white')
-
-    if data["z"].unique().size > 1 and data["frame"].unique().size == 1 and data["channel"].unique().size == 1:
-        _fr = data["frame"].iloc[0]
-        _ch = data["channel"].iloc[0]
-        img = z_projection(imf, _fr, _ch, projection='all-max')
-
-        imgf = skimage.util.img_as_float(img.image)
-        if f"channel-{_ch}" in panel.channel_render_parameters:
-            ch_par = panel.channel_render_parameters[f"channel-{_ch}"]
-            if "overlays" in ch_par and "histogram" in ch_par["overlays"]:
-                # Overlay the histogram on the image plot
-                hst.plot(img)
-            if "color" in ch_par:
-                imgf = exposure.rescale_intensity(imgf, in_range=tuple(np.percentile(imgf, (2, 99))), out_range=(0, 0.85))
-                imgf = np.stack((imgf,) * 3, axis=-1) * panel.channel_render_parameters[f"channel-{_ch}"]["color"][1:4]
-
-        ax.imshow(imgf, cmap='gray', extent=(.0, w_um, h_um, .0),
+    hst = ovl.ImageHistogram(ax=ax, bins=HISTOGRAM_BINS, color='white')
+
+    # only cells of a single frame and channel spanning several focal planes show their projection
+    if len(data) == 1 and data["n_zstacks"].iloc[0] > 1:
+        tile = tiles[(data["frame"].iloc[0], data["channel"].iloc[0])]
+
+        if tile.histogram is not None:
+            # Overlay the histogram on the image plot
+            hst.plot(histogram=tile.histogram)
+
+        ax.imshow(tile.image, cmap='gray', extent=(.0, w_um, h_um, .0),
                   # origin='upper' if self.inv_y else 'lower',
                   origin='upper',
                   interpolation='none', aspect='equal',  # resample=False,
@@ -52,32 +137,41 @@ def plotimg(data, panel=None, **kwargs):
 
 
 def render_static_montage(panel: ConfigPanel,
-                          row=None, col=None):
+                          row=None, col=None, workers=1):
+    """
+    Render the montage of the panel into an image file. The images of the tiles are prepared beforehand, across a pool
+    of processes if workers > 1, so that only drawing them is left to the figure.
+    """
     logger.debug("Making montage of image.")
 
-    # create dataframe of images that will be plotted
-    img_lst = [
-        {
-            'frame':   f,
-            'channel': ch,
-            'z':       z
-        }
-        for ch in panel.channels
-        for z in panel.zstacks
-        for f in panel.frames
-    ]
-    im_df = pd.DataFrame(img_lst)
+    im_df = plan_panel(panel)
+    # images are only drawn in cells of a single frame and channel, so those are the only ones to prepare
+    facets = [f for f in (row, col) if f is not None]
+    cell_size = im_df.groupby(facets)["frame"].transform('size') if facets else pd.Series(len(im_df), im_df.index)
+    requests = im_df[(im_df["n_zstacks"] > 1) & (cell_size == 1)]
+    tiles = prepare_tiles(panel, zip(requests["frame"], requests["channel"]), workers=workers)
 
+    # one axes per value of the row and column facets, drawn on a figure of its own rather than through pyplot
     _s = 4.0
-    g = sns.FacetGrid(im_df, row=row, col=col, height=_s)
-    g = (g.map_dataframe(plotimg, panel=panel)
-         .set_titles("{col_name}")
-         .add_legend()
-         )
-
-    g.figure.tight_layout()
-    plt.subplots_adjust(hspace=0, wspace=0.01, left=0, right=1, top=1, bottom=0)
+    row_vals = sorted(im_df[row].unique()) if row is not None else [None]
+    col_vals = sorted(im_df[col].unique()) if col is not None else [None]
+    fig = Figure(figsize=(len(col_vals) * _s, len(row_vals) * _s))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(nrows=len(row_vals), ncols=len(col_vals), sharex=True, sharey=True, squeeze=False)
+    for i, rv in enumerate(row_vals):
+        for j, cv in enumerate(col_vals):
+            data = im_df
+            if row is not None:
+                data = data[data[row] == rv]
+            if col is not None:
+                data = data[data[col] == cv]
+            if len(data) > 0:
+                plotimg(data, axes[i, j], panel=panel, tiles=tiles)
+            axes[i, j].set_title(f"{cv}" if cv is not None else "")
+
+    fig.tight_layout()
+    fig.subplots_adjust(hspace=0, wspace=0.01, left=0, right=1, top=1, bottom=0)
 
     filepath = panel.configfile.parent / panel.filename
-    g.savefig(filepath)
-    return g
+    fig.savefig(filepath, bbox_inches='tight')
+    return fig
@@ -4,7 +4,9 @@ from pathlib import Path
 import numpy as np
 from fileops.export.config import ConfigMovie
 from fileops.logger import get_logger
-from matplotlib import pyplot as plt, gridspec
+from matplotlib import gridspec
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 import movierender.overlays as ovl
 from movierender import MovieRenderer, SingleImage, CompositeRGBImage
@@ -38,7 +40,8 @@ def make_movie(movie: ConfigMovie, prefix='', suffix='', folder='.', overwrite=F
     log.info(f'aspect ratio={ar}.')
     log.info(f'number of stacks={len(im.zstacks)}, n_rows={n_rows}.')
 
-    fig = plt.figure(frameon=False, figsize=(10, 10), dpi=150)
+    fig = Figure(frameon=False, figsize=(10, 10), dpi=150)
+    FigureCanvasAgg(fig)
     gs = gridspec.GridSpec(nrows=n_rows, ncols=n_cols)
 
     # set positions of scale bars and text
@@ -5,7 +5,10 @@ from .overlay import Overlay
 
 
 class ImageHistogram(Overlay):
-    def plot(self, mdi: MetadataImage, bins=None, ax=None, color=None, **kwargs):
+    def plot(self, mdi: MetadataImage = None, bins=None, ax=None, color=None, histogram=None, **kwargs):
+        """
+        Plot the histogram of the image, or the (counts, bin edges) histogram given if it was computed beforehand.
+        """
         if ax is None:
             ax = self.ax
         assert ax is not None, "No axes found to plot overlay."
@@ -19,7 +22,7 @@ class ImageHistogram(Overlay):
             frameon=False
         )
 
-        hist, bins = np.histogram(mdi.image.ravel(), bins=bins)
+        hist, bins = histogram if histogram is not None else np.histogram(mdi.image.ravel(), bins=bins)
         axi.hist(bins[:-1], bins, weights=hist, histtype='step', color=color, zorder=10)
         # axi.set_xlabel('intensity', color='white')
         # axi.set_ylabel('pixel count', color='white')
@@ -2,6 +2,9 @@ from .overlay import Overlay
 
 
 class ScaleBar(Overlay):
+    dynamic = False
+    rasterizable = True
+
     def plot(self, ax=None, um=None, xy=None, lw=None, fontdict=None, **kwargs):
         if ax is None:
             ax = self.ax
@@ -21,6 +24,21 @@ class ScaleBar(Overlay):
             ax.text(x0 + um / 2, y0 + sbar_lw2_um, f'{um} um', color='w', fontdict=fontdict,
                     horizontalalignment='center', zorder=1000)
 
+    def raster(self, tile, um=None, xy=None, lw=None, fontdict=None, **kwargs):
+        lw = lw if lw is not None else self._kwargs.get("lw", 1)
+        um = um if um is not None else self._kwargs.get("um", None)
+        x0, y0 = xy if xy is not None else self._kwargs.get("xy", (0, 0))
+
+        if um is None:
+            return
+
+        tile.hline(x0, x0 + um, y0, lw, 'w')
+        if kwargs.get("show_text", True):
+            # text sits on top of the scalebar
+            sbar_lw_um = lw * tile.px_per_pt / tile.pix_per_um
+            size = fontdict.get('size', 10) if fontdict is not None else 10
+            tile.text(x0 + um / 2, y0 + sbar_lw_um, f'{um} um', size=size, color='w', ha='center')
+
 
 def secs_to_string(secs: int, string_format="hh:mm:ss"):
     mins = int(secs / 60)
@@ -44,6 +62,19 @@ def secs_to_string(secs: int, string_format="hh:mm:ss"):
 
 
 class Timestamp(Overlay):
+    rasterizable = True
+
+    def _label(self, timestamps, string_format="hh:mm:ss"):
+        txt = ''
+        if timestamps:
+            _secs0 = timestamps[self._renderer.frame - 1] if len(timestamps) >= self._renderer.frame else timestamps[-1]
+            _secs1 = (self._renderer.frame - 1) * self._renderer.image.time_interval
+
+            secs = int(max(_secs0, _secs1))
+            txt = secs_to_string(secs, string_format)
+
+        return f'{self._renderer.frame}  {txt}'
+
     def plot(self, ax=None, xy=(0, 0), string_format="hh:mm:ss", timestamps=None, fontdict=None, va=None, color='white',
              **kwargs):
         if ax is None:
@@ -54,13 +85,19 @@ class Timestamp(Overlay):
             va = 'center'
 
         x0, y0 = xy
-        txt = ''
-        if timestamps:
-            _secs0 = timestamps[self._renderer.frame - 1] if len(timestamps) >= self._renderer.frame else timestamps[-1]
-            _secs1 = (self._renderer.frame - 1) * self._renderer.image.time_interval
+        txt = self._label(timestamps, string_format)
+        ax.text(x0, y0, txt, color=color, fontdict=fontdict, verticalalignment=va, zorder=1000)
 
-            secs = int(max(_secs0, _secs1))
-            txt = secs_to_string(secs, string_format)
+    def raster(self, tile, xy=(0, 0), string_format="hh:mm:ss", timestamps=None, fontdict=None, va=None,
+               color='white', **kwargs):
+        assert timestamps is not None, "Need timestamps to render on tile."
+        size = fontdict.get('size', 10) if fontdict is not None else 10
+        x0, y0 = xy
+        tile.text(x0, y0, self._label(timestamps, string_format), size=size, color=color,
+                  va=va if va is not None else 'center')
 
-        txt = f'{self._renderer.frame}  {txt}'
-        ax.text(x0, y0, txt, color=color, fontdict=fontdict, verticalalignment=va, zorder=1000)
+    def update(self, ax=None, string_format="hh:mm:ss", timestamps=None, **kwargs):
+        if len(self._artists) != 1:
+            return super().update(ax=ax, string_format=string_format, timestamps=timestamps, **kwargs)
+        # only the text of the timestamp changes between frames
+        self._artists[0].set_text(self._label(timestamps, string_format))
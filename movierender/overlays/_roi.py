@@ -7,6 +7,8 @@ from .overlay import Overlay
 
 
 class ImagejROI(Overlay):
+    dynamic = False
+
     def __init__(self, roi_list: List[ImagejRoi] = None, **kwargs):
         assert all(r is not None for r in roi_list), "Need ROIs to render on axes."
         self.roi_lst = roi_list
@@ -2,6 +2,9 @@ from .overlay import Overlay
 
 
 class Text(Overlay):
+    dynamic = False
+    rasterizable = True
+
     def __init__(self, text, **kwargs):
         assert text is not None, "Need text to render on axes."
         self.text = text
@@ -18,3 +21,12 @@ class Text(Overlay):
 
         x0, y0 = xy
         ax.text(x0, y0, self.text, **fontdict)
+
+    def raster(self, tile, xy=None, fontdict=None, **kwargs):
+        if fontdict is None:
+            fontdict = self._kwargs["fontdict"] if "fontdict" in self._kwargs else dict()
+        if xy is None:
+            xy = self._kwargs["xy"] if "xy" in self._kwargs else None
+
+        x0, y0 = xy
+        tile.text(x0, y0, self.text, size=fontdict.get('size', 10), color=fontdict.get('color', 'black'))
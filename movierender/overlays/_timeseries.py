@@ -1,6 +1,3 @@
-import datetime
-import time as tim
-
 import numpy as np
 import pandas as pd
 from matplotlib import dates
@@ -9,27 +6,56 @@ from .overlay import Overlay
 
 
 class DataTimeseries(Overlay):
-    def __init__(self, df: pd.DataFrame, x="time", y=None, frame="frame", time="time", style_dict=None, **kwargs):
+    def __init__(self, df: pd.DataFrame, x="time", y=None, frame="frame", time="time", style_dict=None,
+                 time_axis="hh:mm", **kwargs):
         assert all([it in df.columns for it in [x, y]]), "Data point columns not found in DataFrame."
+        assert time_axis in ("hh:mm", "seconds"), f"Time axis {time_axis} not supported."
         self._x = x
         self._y = y
         self._f = frame
         self._t = time
         self._style = style_dict
+        self._time_axis = time_axis
         # Rename columns if parameters were given
         self.df = (df
                    .rename(columns={frame: 'frame', time: 'time'})
                    .assign(x=df[x], y=df[y]))
 
         # assuming 'x' values are time in seconds
-        # format seconds to date with this format '%H:%M:%S'
-        self.df.loc[:, 'x'] = list(
-            map(datetime.datetime.strptime, map(lambda s: tim.strftime('%H:%M:%S', tim.gmtime(s)), self.df['x']),
-                len(self.df['x']) * ['%H:%M:%S']))
-        self.df.loc[:, 'x'] = pd.to_datetime(self.df.loc[:, 'x'])
+        if time_axis == "hh:mm":
+            # time of the day on 1900-01-01, as parsing a '%H:%M:%S' string would give (whole seconds, wrapped daily)
+            secs = np.floor(self.df['x'].to_numpy(dtype=float)) % 86400
+            self.df['x'] = pd.Timestamp('1900-01-01') + pd.to_timedelta(secs, unit='s')
+
+        # split the data per (unit, signal) once, sorted by frame, so that each frame only needs a binary search
+        self.df = self.df.sort_values(['unit', 'signal', 'frame'])
+        self._series = [(ix_u, ix_sig,
+                         uniseries['frame'].to_numpy(), self._to_num(uniseries['x']), uniseries['y'].to_numpy())
+                        for (ix_u, ix_sig), uniseries in self.df.groupby(['unit', 'signal'], sort=False)]
+        dots = self.df.sort_values('frame', kind='stable')
+        self._dot_frames = dots['frame'].to_numpy()
+        self._dot_xy = np.column_stack([self._to_num(dots['x']), dots['y'].to_numpy()])
+
+        # artists updated on every frame
+        self._background = list()
+        self._dots = None
+        self._lines = dict()
 
         super().__init__(**kwargs)
 
+    def _to_num(self, x: pd.Series) -> np.ndarray:
+        return dates.date2num(x.to_numpy()) if self._time_axis == "hh:mm" else x.to_numpy(dtype=float)
+
+    def _frame(self):
+        return self._renderer.frame if self._renderer is not None else self.df['frame'].max()
+
+    def _color(self, ix_sig):
+        color = self._style[ix_sig]['color'] if self._style is not None and 'color' in self._style[ix_sig] else None
+        return color if color is not None else 'r'
+
+    def background_artists(self):
+        return self._background
+
     def plot(self, ax=None, legend=False, plot_dots=True, lw=2, **kwargs):
         if ax is None:
             ax = self.ax
@@ -41,29 +67,52 @@ class DataTimeseries(Overlay):
         if not np.isfinite([ymin, ymax]).all():
             return
 
-        fr = self._renderer.frame if self._renderer is not None else self.df['frame'].max()
-        dat = self.df.query("frame <= @fr")
-
+        fr = self._frame()
+        self._dots = None
         if plot_dots:
-            ax.scatter(dat['x'].tolist(), dat['y'], s=1, c='gray', zorder=10)
-        for (ix_u, ix_sig), uniseries in self.df.groupby(['unit', 'signal']):
-            ax.plot(uniseries['x'], uniseries['y'], c='gray', lw=0.5, zorder=10)
-        for (ix_u, ix_sig), uniseries in dat.groupby(['unit', 'signal']):
-            color = self._style[ix_sig]['color'] if self._style is not None and 'color' in self._style[ix_sig] else None
-            color = color if color is not None else 'r'
-            ax.plot(uniseries['x'], uniseries['y'], c=color, lw=lw, zorder=20)
+            n = np.searchsorted(self._dot_frames, fr, side='right')
+            self._dots = ax.scatter(self._dot_xy[:n, 0], self._dot_xy[:n, 1], s=1, c='gray', zorder=10)
+        self._background = list()
+        self._lines = dict()
+        for ix_u, ix_sig, frames, x, y in self._series:
+            self._background += ax.plot(x, y, c='gray', lw=0.5, zorder=10)
+        for ix_u, ix_sig, frames, x, y in self._series:
+            n = np.searchsorted(frames, fr, side='right')
+            if n > 0:
+                self._lines[(ix_u, ix_sig)], = ax.plot(x[:n], y[:n], c=self._color(ix_sig), lw=lw, zorder=20)
 
         ax.set_xlim([xmin, xmax])
         ax.set_ylim([ymin, ymax])
 
-        xmin_locator = dates.HourLocator(interval=1)
-        xmaj_locator = dates.HourLocator(byhour=[0, 3, 6, 9, 12, 15, 18, 21, 24, 27])
-        ax.xaxis.set_minor_locator(xmin_locator)
-        ax.xaxis.set_major_locator(xmaj_locator)
-        formatter = dates.DateFormatter('%H:%M')
-        ax.xaxis.set_major_formatter(formatter)
-        ax.set_xlabel("Time [hh:mm]")
-        ax.xaxis_date()
+        if self._time_axis == "seconds":
+            ax.set_xlabel("Time [s]")
+        else:
+            xmin_locator = dates.HourLocator(interval=1)
+            xmaj_locator = dates.HourLocator(byhour=[0, 3, 6, 9, 12, 15, 18, 21, 24, 27])
+            ax.xaxis.set_minor_locator(xmin_locator)
+            ax.xaxis.set_major_locator(xmaj_locator)
+            formatter = dates.DateFormatter('%H:%M')
+            ax.xaxis.set_major_formatter(formatter)
+            ax.set_xlabel("Time [hh:mm]")
+            ax.xaxis_date()
 
         if not legend:
             ax.legend([])
+
+    def update(self, ax=None, lw=2, **kwargs):
+        if not self._background:
+            return super().update(ax=ax, lw=lw, **kwargs)
+
+        # only the data of the current frame is appended to the artists drawn in the first frame
+        if ax is None:
+            ax = self.ax
+        fr = self._frame()
+        if self._dots is not None:
+            self._dots.set_offsets(self._dot_xy[:np.searchsorted(self._dot_frames, fr, side='right')])
+        for ix_u, ix_sig, frames, x, y in self._series:
+            n = np.searchsorted(frames, fr, side='right')
+            line = self._lines.get((ix_u, ix_sig))
+            if line is not None:
+                line.set_data(x[:n], y[:n])
+            elif n > 0:
+                self._lines[(ix_u, ix_sig)], = ax.plot(x[:n], y[:n], c=self._color(ix_sig), lw=lw, zorder=20)
@@ -2,10 +2,18 @@ from movierender.render import MovieRenderer
 
 
 class Overlay(object):
-    def __init__(self, ax=None,  **kwargs):
+    # overlays that depend on the frame being rendered are dynamic, while static ones draw the same on every frame
+    dynamic = True
+    # overlays that implement raster can also be drawn by the raster backend (see RasterMovieRenderer)
+    rasterizable = False
+
+    def __init__(self, ax=None, dynamic=None, **kwargs):
+        if dynamic is not None:
+            self.dynamic = dynamic
         self.layers = [self]
         self._kwargs = kwargs
         self._renderer: MovieRenderer | None = None
+        self._artists = list()  # artists drawn by the overlay, tracked by the renderer
         self.ax = ax
 
     def __radd__(self, ovrl):
@@ -20,3 +28,21 @@ class Overlay(object):
 
     def plot(self, ax, **kwargs):
         pass
+
+    def background_artists(self):
+        # artists of a dynamic overlay that look the same on every frame; in retained mode they are drawn once into the
+        # background of the movie, underneath everything else
+        return list()
+
+    def update(self, ax=None, **kwargs):
+        # called instead of plot on every frame after the first one when the renderer is in retained mode;
+        # by default dynamic overlays are drawn from scratch, subclasses can update their artists in place
+        if not self.dynamic:
+            return
+        for artist in self._artists:
+            artist.remove()
+        self.plot(ax=ax, **kwargs)
+
+    def raster(self, tile, **kwargs):
+        # draws the overlay straight into a tile of the frame when rendering without matplotlib (see rasterizable)
+        raise NotImplementedError(f"Overlay {self.__class__.__name__} can only be rendered with matplotlib.")
@@ -1,2 +1,8 @@
+from ._frame_cache import FrameCache, frame_cache
+from ._parallel import ParallelMovieRenderer
+from ._profiler import Profiler
+from ._raster import RasterMovieRenderer
+from ._segments import parse_frames, shard_frames, segment_filename, concat_segments
 from ._sequential import SequentialMovieRenderer as MovieRenderer
-from .pipelines import ImagePipeline, SingleImage, CompositeRGBImage
+from ._writer import EncoderSettings, read_encoder_settings
+from .pipelines import ImagePipeline, SingleImage, CompositeRGBImage, LUTCompositeImage
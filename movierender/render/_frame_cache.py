@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import types
+from functools import partial
+from pathlib import Path
+
+import imageio.v3 as iio
+import numpy as np
+import pandas as pd
+from fileops.image import ImageFile
+from fileops.pathutils import ensure_dir
+from matplotlib.artist import Artist
+
+# attributes that link layers to the figure and renderer rather than describe how they are drawn
+_NOT_FINGERPRINTED = {'_renderer', 'ax', 'layers', '_artists', 'logger'}
+
+
+def fingerprint(obj, digest=None):
+    """
+    Feed a description of the object into the digest, and return it.
+    Objects are described by their class and attributes, so that two layers configured in the same way give the same
+    digest even if they were built by different processes.
+    """
+    digest = digest if digest is not None else hashlib.sha1()
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes, Path, np.generic)):
+        digest.update(repr(obj).encode())
+    elif isinstance(obj, np.ndarray):
+        digest.update(f"{obj.dtype}{obj.shape}".encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(obj.columns) if isinstance(obj, pd.DataFrame) else obj.name).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, dict):
+        for k in sorted(obj, key=str):
+            digest.update(f"{k}:".encode())
+            fingerprint(obj[k], digest)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        digest.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for it in (sorted(obj, key=repr) if isinstance(obj, (set, frozenset)) else obj):
+            fingerprint(it, digest)
+    elif isinstance(obj, (types.FunctionType, types.MethodType, partial)):
+        digest.update(getattr(obj, '__qualname__', type(obj).__name__).encode())
+    elif isinstance(obj, (Artist, ImageFile, logging.Logger)):
+        # drawn artists and open files are state of the renderer, not parameters of the layer
+        digest.update(type(obj).__name__.encode())
+    elif hasattr(obj, '__dict__'):
+        digest.update(type(obj).__qualname__.encode())
+        fingerprint({k: v for k, v in vars(obj).items() if k not in _NOT_FINGERPRINTED}, digest)
+    else:
+        digest.update(repr(obj).encode())
+    return digest
+
+
+def image_file_identity(image_file: ImageFile) -> tuple:
+    # the modification time and size of the file are part of its identity, so edited files are rendered again
+    st = os.stat(image_file.image_path)
+    return str(image_file.image_path), image_file.series, st.st_size, st.st_mtime_ns
+
+
+class FrameCache:
+    """
+    Stores rendered frames as PNG files named after the hash of everything that determines how they look: the image
+    file, the frame, and the parameters of the figure, image pipelines and overlays (see fingerprint). Frames rendered
+    with the same configuration are reused across runs regardless of encoder settings, so interrupted renders resume
+    where they stopped. The least recently used frames are deleted once the folder holds more than max_bytes.
+    """
+
+    def __init__(self, folder=None, max_bytes=8 * 1024 ** 3):
+        self.folder = Path(folder) if folder is not None else Path.home() / '.cache' / 'movierender' / 'frames'
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+
+    def path(self, key: str) -> Path:
+        return self.folder / key[0:2] / f"{key}.png"
+
+    def get(self, key: str) -> np.ndarray | None:
+        path = self.path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(path)  # mark the frame as recently used
+        return iio.imread(path)[:, :, 0:3]
+
+    def put(self, key: str, img: np.ndarray):
+        path = self.path(key)
+        ensure_dir(path.parent)
+        # write under a temporary name first, so that interrupted renders never leave truncated frames behind
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        iio.imwrite(tmp, img, extension='.png')
+        os.replace(tmp, path)
+
+    def _files(self):
+        return [p for p in self.folder.glob('*/*.png')] if self.folder.exists() else list()
+
+    @property
+    def nbytes(self):
+        return sum(p.stat().st_size for p in self._files())
+
+    def evict(self, max_bytes=None) -> int:
+        """
+        Delete the least recently used frames until the cache holds at most max_bytes, and return how many were deleted.
+        """
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        files = [(p, p.stat()) for p in self._files()]
+        total = sum(st.st_size for _, st in files)
+        deleted = 0
+        for p, st in sorted(files, key=lambda f: f[1].st_mtime):
+            if total <= max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= st.st_size
+            deleted += 1
+        if deleted > 0:
+            self.logger.info(f"Deleted {deleted} frames from cache {self.folder}.")
+        return deleted
+
+    def clear(self) -> int:
+        return self.evict(max_bytes=0)
+
+
+# frames cached by all renderers of the process, unless they are given a cache of their own
+frame_cache = FrameCache(folder=os.environ.get("MOVIERENDER_FRAME_CACHE", None))
@@ -0,0 +1,112 @@
+import contextlib
+import json
+import logging
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+_null_context = contextlib.nullcontext()
+
+
+class Profiler:
+    """
+    Records the wall time spent in each stage of rendering a frame (reading planes, image pipelines, overlays, drawing,
+    encoding...), along with the total time and peak memory allocated by Python and numpy while rendering every frame.
+    Stages can be nested, e.g. reading planes is part of the time of the image pipeline that reads them. A disabled
+    profiler records nothing and costs next to nothing.
+    """
+
+    def __init__(self, enabled=True, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.records: List[Dict] = list()
+        self.logger = logging.getLogger(__name__)
+
+        self._frame = None
+
+    def stage(self, name: str, frame: int = None):
+        if not self.enabled:
+            return _null_context
+        return self._stage(name, frame)
+
+    @contextlib.contextmanager
+    def _stage(self, name: str, frame: int = None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.records.append({'frame': frame if frame is not None else self._frame, 'stage': name,
+                                 'seconds': time.perf_counter() - t0})
+
+    def frame(self, frame: int):
+        if not self.enabled:
+            return _null_context
+        return self._frame_context(frame)
+
+    @contextlib.contextmanager
+    def _frame_context(self, frame: int):
+        self._frame = frame
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            rec = {'frame': frame, 'stage': 'frame', 'seconds': time.perf_counter() - t0}
+            if self.trace_memory:
+                rec['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+            self.records.append(rec)
+            self._frame = None
+
+    def take_records(self) -> List[Dict]:
+        # hands over the records gathered so far, e.g. from a worker process to the renderer writing the movie
+        records, self.records = self.records, list()
+        return records
+
+    def extend(self, records: List[Dict]):
+        self.records.extend(records)
+
+    def dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=['frame', 'stage', 'seconds', 'peak_bytes'])
+
+    def summary(self) -> pd.DataFrame:
+        df = self.dataframe()
+        total = df.loc[df['stage'] == 'frame', 'seconds'].sum()
+        summary = (df
+                   .groupby('stage')
+                   .agg(calls=('seconds', 'size'), total_s=('seconds', 'sum'), mean_ms=('seconds', 'mean'),
+                        max_ms=('seconds', 'max'), peak_mb=('peak_bytes', 'max'))
+                   .sort_values('total_s', ascending=False))
+        summary['mean_ms'] *= 1e3
+        summary['max_ms'] *= 1e3
+        summary['peak_mb'] /= 1024 ** 2
+        summary['share'] = summary['total_s'] / total if total > 0 else float('nan')
+        return summary
+
+    def write(self, path: Path):
+        """
+        Write every record into a CSV file, or into a JSON file along with the summary, depending on the suffix.
+        """
+        path = Path(path)
+        if path.suffix == '.csv':
+            self.dataframe().to_csv(path, index=False)
+        else:
+            with open(path, 'w') as f:
+                json.dump({
+                    'summary': json.loads(self.summary().to_json(orient='index')),
+                    'records': json.loads(self.dataframe().to_json(orient='records')),
+                }, f, indent=1)
+        self.logger.info(f"Profile written to {path}")
+
+    def log_summary(self):
+        if len(self.records) == 0:
+            return
+        self.logger.info(f"Time spent per stage of rendering:\r\n{self.summary().to_string(float_format='%.3f')}")
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Tuple
+
+import matplotlib.colors as mcolors
+import numpy as np
+import skimage
+from fileops.export.config import ConfigMovie
+from matplotlib import ft2font, font_manager
+
+from movierender.render._sequential import SequentialMovieRenderer
+
+
+class GlyphAtlas:
+    """
+    Glyphs of the default matplotlib font rasterized once at a given size, and composed into text masks on demand.
+    """
+
+    def __init__(self, size_px: float):
+        self.size_px = size_px
+        self._font = ft2font.FT2Font(font_manager.findfont(font_manager.FontProperties()))
+        self._font.set_size(size_px, 72)  # at 72 dpi one point is one pixel
+        self._glyphs: Dict[str, Tuple[np.ndarray, float, int, float]] = dict()
+        self._texts: Dict[str, Tuple[np.ndarray, int]] = dict()
+
+    def _glyph(self, char: str):
+        if char not in self._glyphs:
+            font = self._font
+            font.set_text(char, 0)
+            font.draw_glyphs_to_bitmap(antialiased=True)
+            bitmap = np.asarray(font.get_image()).copy()
+            x_offset = font.get_bitmap_offset()[0] / 64
+            above_baseline = bitmap.shape[0] - int(round(font.get_descent() / 64))
+            advance = font.load_char(ord(char)).linearHoriAdvance / 65536
+            self._glyphs[char] = (bitmap, x_offset, above_baseline, advance)
+        return self._glyphs[char]
+
+    def mask(self, text: str) -> Tuple[np.ndarray, int]:
+        """
+        Return the uint8 alpha mask of the text, along with the row of its baseline.
+        """
+        if text in self._texts:
+            return self._texts[text]
+
+        glyphs = [self._glyph(c) for c in text]
+        ascent = max([g[2] for g in glyphs] + [0])
+        descent = max([g[0].shape[0] - g[2] for g in glyphs] + [0])
+        width = math.ceil(sum(g[3] for g in glyphs)) + max([g[0].shape[1] for g in glyphs] + [0]) + 1
+
+        mask = np.zeros((ascent + descent, width), dtype=np.uint8)
+        pen = 0.
+        for bitmap, x_offset, above_baseline, advance in glyphs:
+            h, w = bitmap.shape
+            r, c = ascent - above_baseline, max(0, int(round(pen + x_offset)))
+            np.maximum(mask[r:r + h, c:c + w], bitmap, out=mask[r:r + h, c:c + w])
+            pen += advance
+        mask = mask[:, :max(1, int(math.ceil(pen)))]
+
+        # timestamps change on every frame, so only a bounded number of texts is kept
+        if len(self._texts) > 256:
+            self._texts.clear()
+        self._texts[text] = (mask, ascent)
+        return mask, ascent
+
+
+class Tile:
+    """
+    Region of the frame where the image of one pipeline and its overlays are drawn, at the resolution of the image.
+    Overlays give coordinates in microns with the origin at the bottom left corner, as in the axes of the matplotlib
+    layouts, and sizes in points. A tile is drawn as if it was points_per_tile points wide (about the width of the axes
+    of those layouts), but never with less than one pixel per point.
+    """
+    points_per_tile = 280
+
+    def __init__(self, renderer: RasterMovieRenderer, row: int, column: int):
+        self._renderer = renderer
+        self.row = row
+        self.column = column
+        self.image: np.ndarray | None = None  # H×W×3 view of the frame, assigned by the renderer
+
+        # images are drawn downsampled by the same factor as the planes of the pipelines
+        self.width = renderer.image.width // renderer.downsample
+        self.height = renderer.image.height // renderer.downsample
+        self.pix_per_um = (renderer.image.pix_per_um if renderer.image.pix_per_um is not None else 1) / \
+                          renderer.downsample
+        self.px_per_pt = max(1., max(self.width, self.height) / self.points_per_tile)
+
+    def __repr__(self):
+        return f"<Tile ({self.row}, {self.column}) of {self.width}x{self.height} pixels>"
+
+    def to_pixels(self, x, y) -> Tuple[float, float]:
+        """
+        Return the (row, column) of the pixel at the (x, y) position given in microns.
+        """
+        return self.height - y * self.pix_per_um, x * self.pix_per_um
+
+    def fill(self, r0, r1, c0, c1, color):
+        r0, r1 = max(0, int(round(r0))), min(self.height, int(round(r1)))
+        c0, c1 = max(0, int(round(c0))), min(self.width, int(round(c1)))
+        if r1 > r0 and c1 > c0:
+            self.image[r0:r1, c0:c1] = np.asarray(mcolors.to_rgb(color)) * 255
+
+    def hline(self, x0, x1, y, lw, color):
+        """
+        Draw a horizontal line between x0 and x1 at height y (in microns), with a width of lw points.
+        """
+        r, c0 = self.to_pixels(x0, y)
+        _, c1 = self.to_pixels(x1, y)
+        half = max(1., lw * self.px_per_pt) / 2
+        self.fill(r - half, r + half, c0, c1, color)
+
+    def text(self, x, y, text, size=10, color='white', ha='left', va='baseline'):
+        """
+        Draw the text at the position (x, y) given in microns, with a size in points.
+        """
+        mask, baseline = self._renderer.atlas(size * self.px_per_pt).mask(text)
+        h, w = mask.shape
+        r, c = self.to_pixels(x, y)
+
+        c -= {'left': 0, 'center': w / 2, 'right': w}[ha]
+        r -= {'baseline': baseline, 'top': 0, 'center': h / 2, 'center_baseline': baseline / 2, 'bottom': h}[va]
+        r, c = int(round(r)), int(round(c))
+
+        # clip the text to the tile
+        mr0, mc0 = max(0, -r), max(0, -c)
+        mr1, mc1 = min(h, self.height - r), min(w, self.width - c)
+        if mr1 <= mr0 or mc1 <= mc0:
+            return
+        region = self.image[r + mr0:r + mr1, c + mc0:c + mc1]
+        alpha = mask[mr0:mr1, mc0:mc1, np.newaxis].astype(np.float32) / 255
+        rgb = np.asarray(mcolors.to_rgb(color), dtype=np.float32) * 255
+        region[:] = region * (1 - alpha) + rgb * alpha + 0.5
+
+
+class RasterMovieRenderer(SequentialMovieRenderer):
+    """
+    Renders movies made only of images, scale bars, timestamps and text without matplotlib.
+    Images are placed in a grid of tiles at their native resolution, and overlays are drawn straight into the frame
+    by their raster method. Overlays that need matplotlib (e.g. plots of data) are not supported.
+    """
+
+    def __init__(self, config: ConfigMovie, n_tiles=1, columns=1, title=None, gap=8, downsample=1, **kwargs):
+        super().__init__(None, config, **kwargs)
+
+        self.title = title
+        self.downsample = downsample
+        self.gap = gap
+        self._atlases: Dict[float, GlyphAtlas] = dict()
+
+        rows = math.ceil(n_tiles / columns)
+        self.tiles: List[Tile] = [Tile(self, i // columns, i % columns) for i in range(n_tiles)]
+        self.ax = self.tiles[0]
+
+        # frames have a white background like matplotlib figures, with a band for the title at the top
+        w, h = self.tiles[0].width, self.tiles[0].height
+        title_size = self._kwargs['fontdict'].get('size', 10) * self.tiles[0].px_per_pt
+        title_band = int(2 * title_size) if title else 0
+        self._canvas = np.full((title_band + rows * h + (rows + 1) * gap, columns * w + (columns + 1) * gap, 3), 255,
+                               dtype=np.uint8)
+        for tile in self.tiles:
+            r0 = title_band + gap + tile.row * (h + gap)
+            c0 = gap + tile.column * (w + gap)
+            tile.image = self._canvas[r0:r0 + h, c0:c0 + w]
+
+        if title:
+            mask, _ = self.atlas(title_size).mask(title)
+            mh, mw = mask.shape
+            r0, c0 = max(0, (title_band - mh) // 2), max(0, (self._canvas.shape[1] - mw) // 2)
+            region = self._canvas[r0:r0 + mh, c0:c0 + mw]
+            alpha = mask[:region.shape[0], :region.shape[1], np.newaxis].astype(np.float32) / 255
+            region[:] = region * (1 - alpha) + 0.5
+
+    def _axes_index(self, ax):
+        return self.tiles.index(ax) if ax is not None and ax in self.tiles else None
+
+    def _layout_fingerprint(self) -> dict:
+        return {'canvas': self._canvas.shape, 'title': self.title, 'gap': self.gap}
+
+    def atlas(self, size_px: float) -> GlyphAtlas:
+        size_px = round(size_px, 1)
+        if size_px not in self._atlases:
+            self._atlases[size_px] = GlyphAtlas(size_px)
+        return self._atlases[size_px]
+
+    @staticmethod
+    def _to_rgb8(img: np.ndarray) -> np.ndarray:
+        if img.dtype != np.uint8:
+            img = skimage.util.img_as_ubyte(np.clip(skimage.util.img_as_float(img), 0, 1))
+        if img.ndim == 2:
+            img = img[:, :, np.newaxis]
+        return img
+
+    def render_frame(self, frame):
+        """
+        Draw all image pipelines and overlays of the given frame into the tiles.
+        """
+        self.logger.info(f"rendering frame {frame}")
+        self.frame = frame
+        self.time = (frame - self._frame_offset) / self.fps
+
+        for tile in self.tiles:
+            tile.image[:] = 0
+        for imgp in self.image_pipeline:
+            tile = imgp.ax if imgp.ax is not None else self.ax
+            with self.profiler.stage(f"pipeline:{imgp.__class__.__name__}"):
+                img = self._to_rgb8(imgp())
+            # images are shown with their first row at the bottom unless the y axis is inverted
+            tile.image[:] = img if self.inv_y else img[::-1]
+        for ovrl in self.layers:
+            with self.profiler.stage(f"overlay:{ovrl.__class__.__name__}"):
+                ovrl.raster(ovrl.ax if ovrl.ax is not None else self.ax, **self._overlay_kwargs(ovrl))
+
+    def frame_rgb(self) -> np.ndarray:
+        return self._canvas
+
+    def render(self, filename=None, test=False, cache_frames=False, frames: List[int] = None):
+        # fail before anything is written if an overlay can only be drawn by matplotlib
+        unsupported = sorted({ovrl.__class__.__name__ for ovrl in self.layers if not ovrl.rasterizable})
+        if len(unsupported) > 0:
+            raise ValueError(f"Overlays {', '.join(unsupported)} can't be rendered with the raster backend, "
+                             "render the movie with the matplotlib backend instead.")
+        super().render(filename=filename, test=test, cache_frames=cache_frames, frames=frames)
+
+    def __repr__(self):
+        return f"<MovieRender object (raster) at {hex(id(self))}> with {len(self._kwargs)} arguments."
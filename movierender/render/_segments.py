@@ -0,0 +1,94 @@
+import logging
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List
+
+from moviepy.config import FFMPEG_BINARY
+
+from movierender.render._writer import EncoderSettings
+
+logger = logging.getLogger(__name__)
+
+_frames_rgx = re.compile(r'^([0-9]*):([0-9]*)$')
+_shard_rgx = re.compile(r'^([0-9]+)/([0-9]+)$')
+
+
+def parse_frames(frames: List[int], spec: str) -> List[int]:
+    """
+    Return the frames of the movie within a range written as start:stop, where frames from start up to but not
+    including stop are kept, and either end may be left out (e.g. "0:500" or "500:").
+    """
+    rgx = _frames_rgx.match(spec)
+    if rgx is None:
+        raise ValueError(f"Frame range {spec} not understood, expected start:stop.")
+    start, stop = [int(g) if len(g) > 0 else None for g in rgx.groups()]
+    return [fr for fr in sorted(frames) if (start is None or fr >= start) and (stop is None or fr < stop)]
+
+
+def shard_frames(frames: List[int], spec: str, gop: int = None) -> List[int]:
+    """
+    Return the frames of a shard of the movie written as index/count, with index counted from zero (e.g. "3/8").
+    Frames are split into count runs of consecutive frames of about the same length. If gop is given, runs start at
+    multiples of gop frames, so that keyframes of the segments fall where they would in a movie encoded at once.
+    """
+    rgx = _shard_rgx.match(spec)
+    if rgx is None:
+        raise ValueError(f"Shard {spec} not understood, expected index/count.")
+    index, count = [int(g) for g in rgx.groups()]
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index {index} out of range for {count} shards.")
+
+    frames = sorted(frames)
+    step = gop if gop is not None and gop > 0 else 1
+
+    def boundary(k):
+        # the last shard runs to the end of the movie whatever the rounding
+        if k == count:
+            return len(frames)
+        return min(len(frames), round(k * len(frames) / count / step) * step)
+
+    return frames[boundary(index):boundary(index + 1)]
+
+
+def segment_filename(path: Path, frames: List[int]) -> Path:
+    # frame numbers are zero-padded, so that listing the segments by name puts them in order
+    return path.with_name(f"{path.stem}.f{min(frames):05d}-{max(frames):05d}{path.suffix}")
+
+
+def concat_segments(segments: List[Path], output: Path, encoder: EncoderSettings = None) -> Path:
+    """
+    Join segments of a movie, given in order, into a single file through the concat demuxer of ffmpeg.
+    Segments are copied without encoding them again, which needs them to share codec and size and to start on a
+    keyframe, as segments rendered by this package do. If encoder settings are given, segments are encoded again
+    instead, e.g. to turn lossless ffv1 segments into the final mp4.
+    """
+    output = Path(output)
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for s in segments:
+            path = Path(s).absolute().as_posix().replace("'", r"'\''")
+            f.write(f"file '{path}'\n")
+        listing = Path(f.name)
+
+    # same ffmpeg binary that encodes the movies
+    cmd = [FFMPEG_BINARY, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', str(listing)]
+    if encoder is None:
+        cmd += ['-c', 'copy']
+    else:
+        cmd += ['-c:v', encoder.codec, '-preset', encoder.ffmpeg_preset]
+        if encoder.ffmpeg_bitrate is not None:
+            cmd += ['-b:v', encoder.ffmpeg_bitrate]
+        if encoder.threads is not None:
+            cmd += ['-threads', str(encoder.threads)]
+        cmd += encoder.ffmpeg_params()
+    cmd += [str(output)]
+
+    logger.info(f"Joining {len(segments)} segments into {output}.")
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg failed joining segments into {output}: {e.stderr.strip()}") from e
+    finally:
+        listing.unlink()
+    return output
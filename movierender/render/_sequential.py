@@ -2,21 +2,21 @@ from __future__ import annotations
 
 import logging
 import os
-import uuid
-from pathlib import Path
+from functools import partial
 from typing import List, TYPE_CHECKING
 
-import imageio.v3 as iio
-import moviepy.editor as mpy
 import numpy as np
 import skimage
 from fileops.export.config import ConfigMovie
 from fileops.image import ImageFile
 from fileops.image.exceptions import FrameNotFoundError
-from fileops.pathutils import ensure_dir
 from matplotlib.figure import Figure
 
-from movierender.render.pipelines import SingleImage, ImagePipeline
+from movierender.render._frame_cache import FrameCache, frame_cache, fingerprint, image_file_identity
+from movierender.render._profiler import Profiler
+from movierender.render._writer import MovieWriter, EncoderSettings, figure_to_rgb, canvas_to_rgb
+from movierender.render.pipelines import SingleImage, ImagePipeline, PlanePrefetcher
+from movierender.render.pipelines._planes import read_plane
 
 if TYPE_CHECKING:
     from movierender.overlays import Overlay
@@ -26,7 +26,9 @@ class SequentialMovieRenderer:
     layers: List[Overlay]
     image: ImageFile
 
-    def __init__(self, fig: Figure, config: ConfigMovie, show_axis=False, invert_y=False, **kwargs):
+    def __init__(self, fig: Figure, config: ConfigMovie, show_axis=False, invert_y=False, retained=False,
+                 prefetch_depth=8, frame_cache: FrameCache = None, profiler: Profiler = None,
+                 encoder: EncoderSettings = None, **kwargs):
         self._kwargs = {
             'fontdict': {'size': 10},
         }
@@ -34,7 +36,7 @@ class SequentialMovieRenderer:
 
         self.fig = fig
         self.show_axis = show_axis
-        self.ax = fig.gca()
+        self.ax = fig.gca() if fig is not None else None
 
         self.layers = []
         self.logger = logging.getLogger(__name__)
@@ -44,20 +46,31 @@ class SequentialMovieRenderer:
         self.fps = config.fps
         self.duration = None
         self.bitrate = config.bitrate
+        self.encoder = encoder if encoder is not None else EncoderSettings(bitrate=config.bitrate)
 
         imf = config.image_file
         self._cfg = config
         self.image_pipeline: List[ImagePipeline] = []
         self.image = imf
         self.inv_y = invert_y
+        # in retained mode the figure is laid out once, and then only images and dynamic overlays are updated
+        self.retained = retained
+        self._background = None
+        self._images = dict()
+        self._static_split = (list(), list(), list())
+        self._static_layers = list()
+        # number of image planes read ahead of the frame being rendered (zero disables prefetching)
+        self.prefetch_depth = prefetch_depth
+        self.prefetcher: PlanePrefetcher | None = None
         self._last_f = imf.frames[-1]
         self._max_frame = max(self._cfg.frames)
         self._frame_offset = min(self._cfg.frames)  # used when frames start at a number greater than zero
         self._render = np.zeros((imf.width, imf.height), dtype=float)
         self._load_image()
 
-        self._tmp = Path(os.curdir) / 'tmp' / 'render' / Path(imf.base_path).name / str(uuid.uuid4())
-        ensure_dir(self._tmp)
+        self.frame_cache = frame_cache
+        # time and memory spent rendering each frame are only recorded when an enabled profiler is given
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
 
     def __iter__(self):
         return self
@@ -97,108 +110,333 @@ class SequentialMovieRenderer:
             # 'ranges':     self.image.intensity_ranges
         })
 
-    def render(self, filename=None, test=False):
+    def _overlay_kwargs(self, ovrl: Overlay):
+        kwargs = self._kwargs.copy()
+        kwargs.update(**ovrl._kwargs, show_axis=self.show_axis)
+        return kwargs
+
+    def _figure_artists(self):
+        return {a for ax in self.fig.axes for a in ax.get_children()}
+
+    def _track_artists(self, ovrl: Overlay, fn, **kwargs):
+        # keep track of the artists that the overlay adds to the figure, so they can be updated in later frames
+        before = self._figure_artists()
+        with self.profiler.stage(f"overlay:{ovrl.__class__.__name__}"):
+            fn(ax=self.ax if ovrl.ax is None else None, **kwargs)
+        new_artists = [a for a in self._figure_artists() if a not in before]
+        ovrl._artists = [a for a in ovrl._artists if a.figure is not None] + new_artists
+
+    def _hide_ticks(self, ax):
+        if not self.show_axis and ax is not None:
+            ax.set_xticklabels([])
+            ax.set_yticklabels([])
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+    @staticmethod
+    def _in_draw_order(artists):
+        # axes draw their artists by increasing zorder, and those of equal zorder in the order they were added
+        index = dict()
+        for ax in {a.axes for a in artists}:
+            index.update({a: i for i, a in enumerate(ax.get_children())})
+        return sorted(artists, key=lambda a: (a.get_zorder(), index.get(a, -1)))
+
+    def _animated_artists(self):
+        artists = list(self._images.values())
+        for im in self._images.values():
+            # spines are drawn on top of images
+            artists += [s for s in im.axes.spines.values() if s.get_visible()]
+        for ovrl in self.layers:
+            if ovrl.dynamic:
+                background = ovrl.background_artists()
+                artists += [a for a in ovrl._artists if a not in background]
+        return self._in_draw_order(artists)
+
+    def _static_artists(self):
+        return [a for ovrl in self.layers if not ovrl.dynamic for a in ovrl._artists]
+
+    def _extent(self, artist, renderer):
+        # extents of lines and patches leave out half of the width of their strokes, and antialiasing spills a pixel
+        lw = np.max(artist.get_linewidth(), initial=0) if hasattr(artist, 'get_linewidth') else 0
+        return artist.get_window_extent(renderer).padded(lw * self.fig.dpi / 72 + 2)
+
+    def _split_static_artists(self):
         """
-        Render the movie into an mp4 file.
+        Sort the artists of static overlays by how they stack with the animated artists that overlap them: underneath
+        all of them, or with nothing overlapping them, in the background; on top of all of them, in the layers
+        blended onto every frame; and in between, drawn on every frame along with the animated artists.
         """
+        static = self._static_artists()
+        animated = [a for a in self._animated_artists() if a.axes in {s.axes for s in static}]
+        order = {a: i for i, a in enumerate(self._in_draw_order(static + animated))}
+        renderer = self.fig.canvas.get_renderer()
+        extents = {a: self._extent(a, renderer) for a in static + animated}
+
+        def overlapping(s, artists):
+            return [a for a in artists if a is not s and a.axes is s.axes and extents[a].overlaps(extents[s])]
+
+        place = dict()
+        for s in static:
+            under = [order[a] < order[s] for a in overlapping(s, animated)]
+            place[s] = 'below' if not any(under) else 'above' if all(under) else 'between'
+
+        # static artists also have to stack right with each other: those in the background are drawn before anything
+        # drawn on every frame, and the layers are blended after everything else
+        moved = True
+        while moved:
+            moved = False
+            for s in static:
+                if place[s] == 'below':
+                    drawn_after = [a for a in overlapping(s, static) if place[a] == 'between']
+                    wrong = any(order[a] < order[s] for a in drawn_after)
+                elif place[s] == 'above':
+                    drawn_before = [a for a in overlapping(s, static) if place[a] != 'above']
+                    wrong = any(order[a] > order[s] for a in drawn_before)
+                else:
+                    wrong = False
+                if wrong:
+                    place[s] = 'between'
+                    moved = True
+
+        return tuple([s for s in static if place[s] == p] for p in ('below', 'between', 'above'))
+
+    def _blitted_artists(self):
+        return self._in_draw_order(self._animated_artists() + self._static_split[1])
+
+    def _rasterize_static_layers(self, artists):
+        """
+        Draw the given artists of static overlays of each axes onto a transparent canvas, and keep the smallest region
+        that contains them as an RGBA layer to be blended onto every frame.
+        """
+        renderer = self.fig.canvas.get_renderer()
+        artists_per_axes = dict()
+        for artist in artists:
+            artists_per_axes.setdefault(artist.axes, list()).append(artist)
+
+        layers = list()
+        for ax, artists in artists_per_axes.items():
+            renderer.clear()
+            for artist in self._in_draw_order(artists):
+                self.fig.draw_artist(artist)
+            rgba = np.asarray(self.fig.canvas.buffer_rgba())
+            alpha = rgba[:, :, 3] > 0
+            rows, cols = np.flatnonzero(alpha.any(axis=1)), np.flatnonzero(alpha.any(axis=0))
+            if len(rows) == 0:
+                continue
 
-        def make_frame_mpl(t):
-            self.time = t
-            # calculate frame given time
-            _fr_from_t = int(round(self.fps * t)) + self._frame_offset
-            self.frame = min(_fr_from_t, self._max_frame)
-
-            if self.frame == self._last_f:
-                return self._render
-
-            try:
-                self._render = iio.imread(self._tmp.joinpath(f"f{self.frame:05d}.png"))
-                self._last_f = self.frame
+            region = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+            a = rgba[region][:, :, 3:4].astype(np.float32) / 255
+            # store the layer premultiplied by its alpha, along with the weight of the frame underneath
+            layers.append((region, 1 - a, rgba[region][:, :, 0:3] * a))
+            self.logger.debug(f"static layer of {len(artists)} artists cached for axes {ax}")
 
-                # row, col, ch = self._render.shape
-                # if ch == 3:
-                #     self._render = self._render[:, :, 0:3]
-                self._render = self._render[:, :, 0:3]
-            except FileNotFoundError:
-                self.logger.warning(f"frame {self.frame} not rendered, so using last rendered one")
+        return layers
 
-            # self.logger.debug(f"loaded image of shape {self._render.shape}")
-            return self._render
+    def _retain(self):
+        """
+        Draw everything that doesn't change between frames once and keep it as the background of the movie, then draw
+        the artists that change on top of it.
+        """
+        self._static_split = below, between, above = self._split_static_artists()
+        for artist in below:
+            artist.set_animated(False)
+        for artist in self._animated_artists() + between + above:
+            artist.set_animated(True)
+        with self.profiler.stage("draw"):
+            self.fig.canvas.draw()
+            self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+            self._static_layers = self._rasterize_static_layers(above)
+
+            self.fig.canvas.restore_region(self._background)
+            for artist in self._blitted_artists():
+                self.fig.draw_artist(artist)
+
+    def render_frame(self, frame):
+        """
+        Draw all image pipelines and overlays of the given frame into the figure.
+        """
+        self.logger.info(f"rendering frame {frame}")
+        self.frame = frame
+        # calculate time given frame
+        self.time = (frame - self._frame_offset) / self.fps
+
+        if self.retained and self._background is not None:
+            self._update_frame()
+            return
+
+        # clear axes of all objects
+        self.ax.cla()
+        for ovrl in self.layers:
+            if ovrl.ax is not None:
+                ovrl.ax.cla()
+            ovrl._artists = list()
+        for imgp in self.image_pipeline:
+            if imgp.ax is not None:
+                imgp.ax.cla()
+            self._hide_ticks(imgp.ax)
+
+        self._images = dict()
+        for imgp in self.image_pipeline:
+            ppu = self.image.pix_per_um if self.image.pix_per_um is not None else 1
+            ext = (0, self.image.width / ppu, 0, self.image.height / ppu)
+            ax = imgp.ax if imgp.ax is not None else self.ax
+            with self.profiler.stage(f"pipeline:{imgp.__class__.__name__}"):
+                img = self._displayable(imgp())
+            self._images[imgp] = ax.imshow(img, cmap='gray', extent=ext,
+                                           origin='upper' if self.inv_y else 'lower',
+                                           interpolation='none', aspect='equal',
+                                           zorder=0)
+        for ovrl in self.layers:
+            self._track_artists(ovrl, ovrl.plot, **self._overlay_kwargs(ovrl))
+
+        for ovrl in self.layers:
+            if not ovrl.show_axis:
+                self._hide_ticks(ovrl.ax)
+        self.fig.tight_layout()
+
+        if self.retained:
+            self._retain()
+
+    @staticmethod
+    def _displayable(img: np.ndarray) -> np.ndarray:
+        # RGB images in uint8 are drawn by matplotlib as they are, anything else is converted to floats
+        if img.ndim == 3 and img.dtype == np.uint8:
+            return img
+        return skimage.util.img_as_float(img)
+
+    def _update_frame(self):
+        self.fig.canvas.restore_region(self._background)
+
+        for imgp, im in self._images.items():
+            with self.profiler.stage(f"pipeline:{imgp.__class__.__name__}"):
+                im.set_data(self._displayable(imgp()))
+        for ovrl in self.layers:
+            if ovrl.dynamic:
+                self._track_artists(ovrl, ovrl.update, **self._overlay_kwargs(ovrl))
+
+        if self._split_static_artists() != self._static_split:
+            # dynamic artists moved over or away from static ones, so what is drawn once has to be drawn again
+            self.logger.debug(f"static overlays stack differently in frame {self.frame}, drawing the background again")
+            self._retain()
+            return
+
+        with self.profiler.stage("draw"):
+            for artist in self._blitted_artists():
+                artist.set_animated(True)
+                self.fig.draw_artist(artist)
+
+    def start_prefetch(self, frames):
+        """
+        Start reading the planes that the image pipelines need to render the given frames in the background.
+        """
+        self.stop_prefetch()
+        if self.prefetch_depth > 0:
+            plan = [key for fr in frames for imgp in self.image_pipeline for key in imgp.planes(fr)]
+            self.prefetcher = PlanePrefetcher(partial(read_plane, self.image), plan, depth=self.prefetch_depth)
 
-        def render_frame(frame):
+    def stop_prefetch(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
 
-            self.logger.info(f"rendering frame {frame}")
-            self.frame = frame
-            # calculate time given frame
-            self.time = (frame - self._frame_offset) / self.fps
+    def frame_rgb(self) -> np.ndarray:
+        """
+        Return the RGB image of the frame drawn last.
+        """
+        if not self.retained:
+            with self.profiler.stage("draw"):
+                return figure_to_rgb(self.fig)
+
+        # the canvas was already updated by blitting the artists of the frame, so only static layers are missing
+        with self.profiler.stage("static layers"):
+            img = canvas_to_rgb(self.fig).copy()
+            for region, weight, layer in self._static_layers:
+                img[region] = img[region] * weight + layer
+        return img
+
+    def _axes_index(self, ax):
+        return self.fig.axes.index(ax) if ax is not None and ax in self.fig.axes else None
+
+    def _layout_fingerprint(self) -> dict:
+        return {
+            'figure': (tuple(self.fig.get_size_inches()), self.fig.dpi,
+                       [ax.get_position().bounds for ax in self.fig.axes]),
+        }
 
-            img_path = self._tmp.joinpath(f"f{frame:05d}.png")
-            if os.path.exists(img_path):
-                self.logger.warning(f'File {img_path.name} already exists in folder {img_path.parent.name}.')
+    def cache_key(self) -> str:
+        """
+        Hash of everything that determines how frames look, except for the frame number (see frame_key).
+        It has to be computed before rendering, as image pipelines and overlays keep state of the frames drawn.
+        """
+        digest = fingerprint({
+            'file':      image_file_identity(self.image),
+            'layout':    self._layout_fingerprint(),
+            'kwargs':    self._kwargs,
+            'inv_y':     self.inv_y,
+            'show_axis': self.show_axis,
+            'pipelines': [(self._axes_index(imgp.ax), imgp) for imgp in self.image_pipeline],
+            'layers':    [(self._axes_index(ovrl.ax), ovrl) for ovrl in self.layers],
+        })
+        return digest.hexdigest()
+
+    @staticmethod
+    def frame_key(cache_key: str, frame: int) -> str:
+        return fingerprint((cache_key, int(frame))).hexdigest()
+
+    def _frame_cache(self, cache_frames) -> FrameCache | None:
+        if not cache_frames:
+            return None
+        return self.frame_cache if self.frame_cache is not None else frame_cache
+
+    def _render_and_write(self, fr, writer: MovieWriter, cache: FrameCache = None, key: str = None):
+        prof = self.profiler
+        if cache is not None:
+            with prof.stage("cache"):
+                cached = cache.get(self.frame_key(key, fr))
+            if cached is not None:
+                self.logger.info(f'Using frame {fr} already rendered in cache {cache.folder}.')
+                with prof.stage("encode"):
+                    writer.write(cached)
                 return
 
-            # clear axes of all objects
-            self.ax.cla()
-            for ovrl in self.layers:
-                if ovrl.ax is not None:
-                    ovrl.ax.cla()
-            for imgp in self.image_pipeline:
-                if imgp.ax is not None:
-                    imgp.ax.cla()
-                if not self.show_axis and imgp.ax is not None:
-                    imgp.ax.set_xticklabels([])
-                    imgp.ax.set_yticklabels([])
-                    imgp.ax.set_xticks([])
-                    imgp.ax.set_yticks([])
-
-            for imgp in self.image_pipeline:
-                ppu = self.image.pix_per_um if self.image.pix_per_um is not None else 1
-                ext = (0, self.image.width / ppu, 0, self.image.height / ppu)
-                ax = imgp.ax if imgp.ax is not None else self.ax
-                img = imgp()
-                img = skimage.util.img_as_float(img)
-                ax.imshow(img, cmap='gray', extent=ext,
-                          origin='upper' if self.inv_y else 'lower',
-                          interpolation='none', aspect='equal',
-                          zorder=0)
-                for ovrl in self.layers:
-                    kwargs = self._kwargs.copy()
-                    kwargs.update(**ovrl._kwargs, show_axis=self.show_axis)
-                    ovrl.plot(ax=self.ax if ovrl.ax is None else None, **kwargs)
-
-            for ovrl in self.layers:
-                if not ovrl.show_axis and ovrl.ax is not None:
-                    ovrl.ax.set_xticklabels([])
-                    ovrl.ax.set_yticklabels([])
-                    ovrl.ax.set_xticks([])
-                    ovrl.ax.set_yticks([])
-            self.fig.tight_layout()
-            self.fig.savefig(img_path, facecolor='white', transparent=False)
+        try:
+            self.render_frame(fr)
+        except FrameNotFoundError:
+            return
 
+        img = self.frame_rgb()
+        if cache is not None:
+            with prof.stage("cache"):
+                cache.put(self.frame_key(key, fr), img)
+        with prof.stage("encode"):
+            writer.write(img)
+
+    def render(self, filename=None, test=False, cache_frames=False, frames: List[int] = None):
+        """
+        Render the movie into a video file encoded with the settings of the renderer (see EncoderSettings).
+        Frames are rasterized in memory and streamed to ffmpeg one at a time. If cache_frames is set, frames are
+        also stored in the frame cache, and frames rendered before with the same configuration are taken from it.
+        If frames is given, only those frames of the movie are rendered, e.g. into a segment (see shard_frames).
+        """
         # Start of method
         if filename is None:
             _, filename = os.path.split(self._file)
-            filename += ".mp4"
-        rendered_frames = list()
-        for fr in sorted(self._cfg.frames):
+            filename += self.encoder.extension
+        cache = self._frame_cache(cache_frames)
+        key = self.cache_key() if cache is not None else None
+
+        with MovieWriter(filename, fps=self._cfg.fps, encoder=self.encoder) as writer:
+            frames = sorted(frames if frames is not None else self._cfg.frames)
+            self.start_prefetch([fr for fr in frames
+                                 if cache is None or not cache.path(self.frame_key(key, fr)).exists()])
             try:
-                render_frame(fr)
-                rendered_frames.append(fr)
-            except FrameNotFoundError:
-                continue
-
-        dur = len(rendered_frames) / self.fps
-        animation = mpy.VideoClip(make_frame_mpl, duration=dur)
-        animation.write_videofile(filename,
-                                  fps=self._cfg.fps,
-                                  bitrate=self._cfg.bitrate,
-                                  # codec='libx264',
-                                  # audio_codec='pcm_s32le',
-                                  ffmpeg_params=[
-                                      '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
-                                      '-pix_fmt', 'yuv420p'
-                                  ])
-        animation.close()
+                for fr in frames:
+                    with self.profiler.frame(fr):
+                        self._render_and_write(fr, writer, cache, key)
+            finally:
+                self.stop_prefetch()
+                if cache is not None:
+                    cache.evict()
 
     def __repr__(self):
         return f"<MovieRender object (sequential) at {hex(id(self))}> with {len(self._kwargs)} arguments."
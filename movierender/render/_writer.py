@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import configparser
+import logging
+from typing import List, NamedTuple
+
+import numpy as np
+from fileops.export.config import ConfigMovie
+from matplotlib.figure import Figure
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+CODECS = ('libx264', 'libx265', 'libvpx-vp9', 'ffv1')
+
+# speed of libvpx-vp9 (-cpu-used) equivalent to each preset of x264 and x265
+_VP9_CPU_USED = {'ultrafast': 8, 'superfast': 7, 'veryfast': 6, 'faster': 5, 'fast': 4, 'medium': 3, 'slow': 2,
+                 'slower': 1, 'veryslow': 0}
+
+
+def figure_to_rgb(fig: Figure) -> np.ndarray:
+    """
+    Rasterize the figure canvas and return a view of its RGB buffer.
+    """
+    fig.canvas.draw()
+    return canvas_to_rgb(fig)
+
+
+def canvas_to_rgb(fig: Figure) -> np.ndarray:
+    # the returned array is a view of the canvas buffer, so it's only valid until the next draw
+    return np.asarray(fig.canvas.buffer_rgba())[:, :, 0:3]
+
+
+class EncoderSettings(NamedTuple):
+    """
+    Settings of the ffmpeg encoder of the movies.
+    Quality is given either as a constant rate factor (crf) or as a bitrate, crf taking precedence if both are given.
+    The preset trades encoding time for file size (e.g. 'ultrafast' for previews), threads bounds the threads used by
+    the encoder, and gop is the maximum number of frames between keyframes. ffv1 is lossless and written into mkv files.
+    """
+    codec: str = 'libx264'
+    preset: str = None
+    crf: int = None
+    bitrate: str = None
+    threads: int = None
+    gop: int = None
+
+    def updated(self, **kwargs) -> 'EncoderSettings':
+        # settings given as None keep their current value
+        return self._replace(**{k: v for k, v in kwargs.items() if v is not None})
+
+    @property
+    def extension(self) -> str:
+        return '.mkv' if self.codec == 'ffv1' else '.mp4'
+
+    def ffmpeg_params(self) -> List[str]:
+        assert self.codec in CODECS, f"Codec {self.codec} not supported."
+        # frames are padded to even sizes as required by yuv420p
+        params = ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        if self.codec == 'ffv1':
+            params += ['-pix_fmt', 'bgr0', '-level', '3', '-g', str(self.gop if self.gop is not None else 1)]
+            return params
+
+        params += ['-pix_fmt', 'yuv420p']
+        if self.codec == 'libvpx-vp9':
+            cpu_used = _VP9_CPU_USED.get(self.preset if self.preset is not None else 'medium', 3)
+            params += ['-deadline', 'realtime' if cpu_used > 5 else 'good', '-cpu-used', str(cpu_used),
+                       '-row-mt', '1']
+            if self.crf is not None:
+                # constant quality mode of vp9 needs the bitrate set to zero
+                params += ['-crf', str(self.crf), '-b:v', '0']
+        elif self.crf is not None:
+            params += ['-crf', str(self.crf)]
+        if self.codec == 'libx265':
+            params += ['-tag:v', 'hvc1']  # so that QuickTime plays the movies
+        if self.gop is not None:
+            params += ['-g', str(self.gop)]
+        return params
+
+    @property
+    def ffmpeg_bitrate(self) -> str | None:
+        if self.codec == 'ffv1' or self.crf is not None:
+            return None
+        return self.bitrate
+
+    @property
+    def ffmpeg_preset(self) -> str:
+        # x264 and x265 are the only encoders that take a preset, others ignore it
+        return self.preset if self.preset is not None and self.codec in ('libx264', 'libx265') else 'medium'
+
+
+def read_encoder_settings(movie: ConfigMovie) -> EncoderSettings:
+    """
+    Return the encoder settings of the movie section of a configuration file, e.g.
+
+        [MOVIE-1]
+        codec = libx265
+        preset = fast
+        crf = 26
+        encoder_threads = 4
+        gop = 50
+
+    The bitrate is taken from ConfigMovie, and settings not given keep their default value.
+    """
+    cfg = configparser.ConfigParser()
+    cfg.read(movie.configfile)
+    section = cfg[movie.header] if movie.header in cfg else dict()
+    return EncoderSettings().updated(
+        codec=section.get('codec'),
+        preset=section.get('preset'),
+        crf=int(section['crf']) if 'crf' in section else None,
+        bitrate=movie.bitrate,
+        threads=int(section['encoder_threads']) if 'encoder_threads' in section else None,
+        gop=int(section['gop']) if 'gop' in section else None,
+    )
+
+
+class MovieWriter:
+    """
+    Streams RGB frames straight into an ffmpeg process.
+    The process is started when the first frame arrives, so that the size of the video matches the rasterized figure.
+    """
+
+    def __init__(self, filename, fps, encoder: EncoderSettings = None):
+        self.filename = str(filename)
+        self.fps = fps
+        self.encoder = encoder if encoder is not None else EncoderSettings()
+        self.n_frames = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._writer: FFMPEG_VideoWriter | None = None
+        self._size = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, img: np.ndarray):
+        h, w = img.shape[0:2]
+        if self._writer is None:
+            self.logger.info(f"Writing video {self.filename} of size WxH({w},{h}).")
+            self._size = (w, h)
+            enc = self.encoder
+            self._writer = FFMPEG_VideoWriter(self.filename, self._size, self.fps,
+                                              codec=enc.codec,
+                                              preset=enc.ffmpeg_preset,
+                                              bitrate=enc.ffmpeg_bitrate,
+                                              threads=enc.threads,
+                                              ffmpeg_params=enc.ffmpeg_params())
+        elif (w, h) != self._size:
+            raise ValueError(f"Frame of size WxH({w},{h}) differs from the size of the video {self._size}.")
+
+        self._writer.write_frame(np.ascontiguousarray(img, dtype=np.uint8))
+        self.n_frames += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.logger.info(f"Video {self.filename} done ({self.n_frames} frames).")
@@ -2,3 +2,10 @@ from ._exception import PipelineException
 from ._image_pipeline_base import ImagePipeline
 from ._image_pipeline_composite_rgb import CompositeRGBImage
 from ._image_pipeline_single import SingleImage
+from ._prefetch import PlanePrefetcher
+from ._projection_cache import ProjectionCache, projection_cache, cached_z_projection
+from ._memmap import PlaneMemmap, plane_memmap, memmap_plane
+from ._zprojection import z_projection, parse_projection
+from ._planes import read_plane, block_mean
+from ._intensity import IntensityRange, fast_percentile
+from ._image_pipeline_lut import LUTCompositeImage, color_lut
@@ -1,15 +1,32 @@
+from __future__ import annotations
+
 import logging
+from functools import partial
+from typing import Dict, List, Tuple
+
+import numpy as np
 
 from movierender.render.pipelines import PipelineException
+from movierender.render.pipelines._intensity import IntensityRange
+from movierender.render.pipelines._planes import read_plane, block_mean
 
 
 class ImagePipeline:
-    def __init__(self, *args, ax=None, zstack=0, **kwargs):
+    def __init__(self, *args, ax=None, zstack=0, intensity_range='frame', smoothing_window=5, movie_samples=10,
+                 downsample=1, **kwargs):
         self._kwargs = kwargs
         self.ax = ax
         self.zstack = zstack
+        # planes are averaged in blocks of downsample×downsample pixels when they are larger than what is displayed
+        self.downsample = downsample
         self.logger = logging.getLogger(__name__)
 
+        # how intensity ranges for contrast stretching are computed (see IntensityRange)
+        self.intensity_range = intensity_range
+        self.smoothing_window = smoothing_window
+        self.movie_samples = movie_samples
+        self._ranges: Dict[int, IntensityRange] = dict()
+
         # if len(args) > 0 and isinstance(args[0], MovieRenderer):
         if len(args) > 0 and args[0].__class__.__name__[-13:] == 'MovieRenderer':
             self._renderer = args[0]
@@ -35,5 +52,42 @@ class ImagePipeline:
                 return ovrl
         return self
 
+    def planes(self, frame) -> List[Tuple[int, int, object]]:
+        """
+        Return the (frame, channel, zstack) planes that the pipeline reads to render the given frame.
+        """
+        return list()
+
+    def _plane(self, channel, zstack=None) -> np.ndarray | None:
+        r = self._renderer
+        zstack = self.zstack if zstack is None else zstack
+        with r.profiler.stage("read"):
+            if getattr(r, 'prefetcher', None) is not None:
+                img = r.prefetcher.get(r.frame, channel, zstack)
+            else:
+                img = read_plane(r.image, r.frame, channel, zstack)
+        if self.downsample > 1:
+            with r.profiler.stage("downsample"):
+                img = block_mean(img, self.downsample)
+        return img
+
+    def _range(self, channel, img: np.ndarray, percentiles) -> Tuple[float, float]:
+        if channel not in self._ranges:
+            self._ranges[channel] = IntensityRange(percentiles, mode=self.intensity_range,
+                                                   window=self.smoothing_window)
+        rng = self._ranges[channel]
+
+        if rng.mode == 'movie' and not rng.fitted:
+            # sample frames evenly across the movie to compute the range only once
+            r = self._renderer
+            frames = sorted(r._cfg.frames)
+            samples = sorted({frames[int(i)] for i in np.linspace(0, len(frames) - 1, self.movie_samples)})
+            self.logger.info(f"Computing intensity range of channel {channel} from frames {samples}")
+            # planes are read by the prefetcher while it runs, as image files can't be read from two threads at once
+            read = r.prefetcher.read if getattr(r, 'prefetcher', None) is not None else partial(read_plane, r.image)
+            rng.fit([read(fr, channel, self.zstack) for fr in samples])
+
+        return rng(img)
+
     def __call__(self, *args, **kwargs):
         raise NotImplementedError
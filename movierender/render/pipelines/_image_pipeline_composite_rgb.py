@@ -1,55 +1,83 @@
 import matplotlib.colors as mcolors
 import numpy as np
-from skimage import color, exposure
+from skimage.util.dtype import dtype_range
 
 from movierender.render.pipelines._image_pipeline_base import ImagePipeline
 
 
 class CompositeRGBImage(ImagePipeline):
-    def _img(self, channel):
-        r = self._renderer
-
-        if type(self.zstack) is int:
-            ix = r.image.ix_at(c=channel, z=self.zstack, t=r.frame)
-            self.logger.debug(f"Retrieving frame {r.frame} of channel {channel} at z-stack={self.zstack} "
-                              f"(index={ix})")
-            imf = r.image.image(ix)
-            if imf is not None:
-                return r.image.image(ix).image
-            return None
-        elif type(self.zstack) is str:
-            if self.zstack == "all-max":  # max projection
-                self.logger.debug(f"Retrieving max z projection of frame {r.frame} and channel {channel}")
-                return r.image.z_projection(frame=r.frame, channel=channel).image
-            return None
-        return None
+    def __init__(self, *args, output='float', **kwargs):
+        super().__init__(*args, **kwargs)
+        # the composite is returned either as float32 values in [0, 1] or as uint8
+        assert output in ('float', 'uint8'), "Output of the composite has to be either float or uint8."
+        self.output = output
 
-    def __call__(self, *args, **kwargs):
-        if 'channeldict' not in self._kwargs:
-            raise Exception("Channel parameters needed to apply this pipeline.")
-        channeldict = self._kwargs['channeldict']
+        # buffers reused across frames
+        self._stack: np.ndarray | None = None  # C×H×W intensities of every channel
+        self._rgb: np.ndarray | None = None  # H×W×3 composite
+        self._rgb8: np.ndarray | None = None
 
-        r = self._renderer
+    def planes(self, frame):
+        channeldict = self._kwargs.get('channeldict', dict())
+        return [(frame, settings['id'], self.zstack) for settings in channeldict.values()]
 
-        dtype = None
-        background = np.zeros((r.image.height, r.image.width) + (3,), dtype=np.float64)
+    def _intensity_range(self, img: np.ndarray, settings):
+        # Contrast enhancing by stretching the histogram
+        if 'rescale' in settings and settings['rescale']:
+            if type(settings['rescale']) is dict:
+                return settings['rescale']['range']
+            elif type(settings['rescale']) is bool and settings['rescale']:
+                return self._range(settings['id'], img, (0.1, 99.9))
+        # map the full range of the data type into [0, 1] as img_as_float does
+        if np.issubdtype(img.dtype, np.floating):
+            return 0., 1.
+        return 0., dtype_range[img.dtype.type][1]
+
+    @staticmethod
+    def _color_matrix(channeldict) -> np.ndarray:
+        colors = list()
         for name, settings in channeldict.items():
-            channel = settings['id']
-            _img = self._img(channel)
-            if dtype is None:
-                dtype = _img.dtype
-
-            # Contrast enhancing by stretching the histogram
-            if 'rescale' in settings and settings['rescale']:
-                if type(settings['rescale']) is dict:
-                    mini, maxi = settings['rescale']['range']
-                    _img = exposure.rescale_intensity(_img, in_range=(mini, maxi))
-                elif type(settings['rescale']) is bool and settings['rescale']:
-                    _img = exposure.rescale_intensity(_img, in_range=tuple(np.percentile(_img, (0.1, 99.9))))
-
-            _img = color.gray2rgb(_img)
             rgb_vector_color = mcolors.to_rgb(settings['color'])
             assert isinstance(rgb_vector_color, tuple)
-            background += _img * rgb_vector_color * settings['intensity']
+            colors.append(np.asarray(rgb_vector_color) * settings['intensity'])
+        return np.asarray(colors, dtype=np.float32)
+
+    def _allocate(self, n_channels, height, width):
+        if self._stack is None or self._stack.shape != (n_channels, height, width):
+            self._stack = np.empty((n_channels, height, width), dtype=np.float32)
+            self._rgb = np.empty((height, width, 3), dtype=np.float32)
+            self._rgb8 = np.empty((height, width, 3), dtype=np.uint8)
+
+    def _composite(self, planes, channeldict) -> np.ndarray:
+        # mix planes already read, one per channel of channeldict, into the composite
+        for i, (_img, settings) in enumerate(zip(planes, channeldict.values())):
+            self._allocate(len(channeldict), *_img.shape)
+
+            # normalize intensities of the channel into [0, 1] in place
+            mini, maxi = self._intensity_range(_img, settings)
+            out = self._stack[i]
+            # subtracted in single precision, as pixels of integer planes below mini would wrap around
+            np.subtract(_img, mini, out=out, dtype=np.float32, casting='unsafe')
+            np.multiply(out, 1 / (maxi - mini) if maxi > mini else 0, out=out)
+            np.clip(out, 0, 1, out=out)
+
+        # mix the colors of all channels as a single (H·W)×C by C×3 product
+        n_channels, height, width = self._stack.shape
+        np.matmul(self._stack.reshape(n_channels, -1).T, self._color_matrix(channeldict),
+                  out=self._rgb.reshape(-1, 3))
+        np.clip(self._rgb, 0, 1, out=self._rgb)
+
+        if self.output == 'uint8':
+            np.multiply(self._rgb, 255, out=self._rgb)
+            np.add(self._rgb, 0.5, out=self._rgb)
+            np.copyto(self._rgb8, self._rgb, casting='unsafe')
+            return self._rgb8
+        return self._rgb
+
+    def __call__(self, *args, **kwargs):
+        if 'channeldict' not in self._kwargs:
+            raise Exception("Channel parameters needed to apply this pipeline.")
+        channeldict = self._kwargs['channeldict']
 
-        return background.astype(dtype)
+        planes = [self._plane(settings['id']) for settings in channeldict.values()]
+        return self._composite(planes, channeldict)
@@ -0,0 +1,77 @@
+from typing import Dict, Tuple
+
+import matplotlib.colors as mcolors
+import numpy as np
+
+from movierender.render.pipelines._image_pipeline_composite_rgb import CompositeRGBImage
+
+
+def color_lut(mini, maxi, color, gamma=1.0, bits=16) -> np.ndarray:
+    """
+    Build a lookup table of 2**bits entries that maps every intensity value straight into an uint8 RGB color.
+    Intensities are stretched from [mini, maxi] into [0, 1], raised to gamma and multiplied by color.
+    """
+    values = np.arange(2 ** bits, dtype=np.float32)
+    values -= mini
+    values *= 1 / (maxi - mini) if maxi > mini else 0
+    np.clip(values, 0, 1, out=values)
+    if gamma != 1.0:
+        np.power(values, gamma, out=values)
+
+    lut = values[:, np.newaxis] * (np.asarray(color, dtype=np.float32) * 255)
+    np.clip(lut, 0, 255, out=lut)
+    lut += 0.5
+    return lut.astype(np.uint8)
+
+
+class LUTCompositeImage(CompositeRGBImage):
+    """
+    Composite of integer images of up to 16 bits mapped through one lookup table per channel.
+    Tables have intensity range, color and gamma (optional 'gamma' key of the channel settings) baked in, and are only
+    rebuilt when any of them changes, so that each frame costs a table lookup and a saturating sum per channel.
+    Other images are rendered as in CompositeRGBImage.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, output='uint8', **kwargs)
+
+        self._luts: Dict[int, Tuple[tuple, np.ndarray]] = dict()
+        self._lookup: np.ndarray | None = None  # H×W×3 colors of one channel
+        self._sum: np.ndarray | None = None  # H×W×3 saturating sum of all channels
+
+    def _lut(self, img: np.ndarray, settings) -> np.ndarray:
+        mini, maxi = self._intensity_range(img, settings)
+        color = tuple(np.asarray(mcolors.to_rgb(settings['color'])) * settings['intensity'])
+        key = (float(mini), float(maxi), color, settings.get('gamma', 1.0), img.dtype.itemsize * 8)
+
+        cached = self._luts.get(settings['id'])
+        if cached is None or cached[0] != key:
+            cached = (key, color_lut(*key))
+            self._luts[settings['id']] = cached
+        return cached[1]
+
+    def __call__(self, *args, **kwargs):
+        if 'channeldict' not in self._kwargs:
+            raise Exception("Channel parameters needed to apply this pipeline.")
+        channeldict = self._kwargs['channeldict']
+
+        planes = [self._plane(settings['id']) for settings in channeldict.values()]
+        if not all(p.dtype in (np.uint8, np.uint16) for p in planes):
+            # planes that don't fit a table are mixed as in CompositeRGBImage, without reading them again
+            return self._composite(planes, channeldict)
+
+        height, width = planes[0].shape
+        if self._sum is None or self._sum.shape != (height, width, 3):
+            self._lookup = np.empty((height, width, 3), dtype=np.uint8)
+            self._sum = np.empty((height, width, 3), dtype=np.uint16)
+            self._rgb8 = np.empty((height, width, 3), dtype=np.uint8)
+
+        self._sum.fill(0)
+        for img, settings in zip(planes, channeldict.values()):
+            np.take(self._lut(img, settings), img, axis=0, out=self._lookup)
+            np.add(self._sum, self._lookup, out=self._sum)
+
+        # saturate the sum of all channels back into uint8
+        np.minimum(self._sum, 255, out=self._sum)
+        np.copyto(self._rgb8, self._sum, casting='unsafe')
+        return self._rgb8
@@ -1,20 +1,20 @@
 import numpy as np
-from fileops.image.imagemeta import MetadataImage
 from skimage import exposure
 
 from movierender.render.pipelines._image_pipeline_base import ImagePipeline
 
 
 class SingleImage(ImagePipeline):
-    def __call__(self, *args, channel=0, adjust_exposure=True, **kwargs):
+    def planes(self, frame):
+        return [(frame, self._kwargs.get('channel', 0), self.zstack)]
+
+    def __call__(self, *args, channel=None, adjust_exposure=True, **kwargs):
         r = self._renderer
+        channel = channel if channel is not None else self._kwargs.get('channel', 0)
 
-        ix = r.image.ix_at(c=channel, z=self.zstack, t=r.frame)
-        self.logger.debug(f"Retrieving frame {r.frame} of channel {channel} at z-stack={self.zstack} "
-                          f"(index={ix})")
-        mimg = r.image.image(ix)
-        img = mimg.image if (type(mimg) is MetadataImage and mimg.image is not None) else np.zeros((r.width, r.height))
+        img = self._plane(channel)
+        img = img if img is not None else np.zeros((r.width, r.height))
         if adjust_exposure:
-            p2, p98 = np.percentile(img, (2, 98))
+            p2, p98 = self._range(channel, img, (2, 98))
             img = exposure.rescale_intensity(img, in_range=(p2, p98))
         return img
@@ -0,0 +1,63 @@
+from collections import deque
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+def fast_percentile(img: np.ndarray, q, max_samples=1_000_000) -> np.ndarray:
+    """
+    Estimate percentiles of an image in a linear pass.
+    Integer images of up to 16 bits are counted into a histogram, while other images are subsampled to at most
+    max_samples pixels before computing the percentiles.
+    """
+    q = np.asarray(q, dtype=float)
+    flat = img.ravel()
+    if np.issubdtype(img.dtype, np.integer) and img.dtype.itemsize <= 2:
+        offset = -np.iinfo(img.dtype).min
+        counts = np.bincount(flat if offset == 0 else flat.astype(np.int32) + offset)
+        cdf = np.cumsum(counts)
+        # value of the sorted pixels at the (floored) rank of each percentile
+        ranks = np.floor(q / 100 * (cdf[-1] - 1))
+        return np.searchsorted(cdf, ranks, side='right') - offset
+
+    step = max(1, flat.size // max_samples)
+    return np.percentile(flat[::step], q)
+
+
+class IntensityRange:
+    """
+    Intensity range of a channel used to stretch its contrast.
+    With mode 'frame' the range is taken from the percentiles of each frame, 'smooth' averages the percentiles of
+    the last window frames, and 'movie' computes them once from frames sampled across the whole movie (see fit).
+    """
+
+    def __init__(self, percentiles=(0.1, 99.9), mode='frame', window=5):
+        assert mode in ('frame', 'smooth', 'movie'), f"Mode {mode} of intensity range not supported."
+        self.percentiles = percentiles
+        self.mode = mode
+        self.range: Tuple[float, float] | None = None
+        self._history = deque(maxlen=window)
+
+    @property
+    def fitted(self):
+        return self.range is not None
+
+    def fit(self, images: Iterable[np.ndarray], max_samples=1_000_000):
+        images = list(images)
+        step = max(1, sum(img.size for img in images) // max_samples)
+        pool = np.concatenate([img.ravel()[::step] for img in images])
+        self.range = tuple(float(v) for v in fast_percentile(pool, self.percentiles))
+        return self
+
+    def __call__(self, img: np.ndarray) -> Tuple[float, float]:
+        if self.mode == 'movie':
+            if not self.fitted:
+                self.fit([img])
+            return self.range
+
+        rng = fast_percentile(img, self.percentiles)
+        if self.mode == 'smooth':
+            self._history.append(rng)
+            rng = np.mean(self._history, axis=0)
+        # plain floats, so that subtracting the range from an integer image never wraps around
+        return tuple(float(v) for v in rng)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import tifffile as tf
+from fileops.image import ImageFile
+
+logger = logging.getLogger(__name__)
+
+# a page of a TIFF file, as the path of the file and the index of the page in it
+PageLocation = Tuple[Path, int]
+
+
+def _locate_ome_page(image_file, plane) -> PageLocation:
+    page, c, z, t = image_file.all_planes_md_dict[plane]
+    return Path(image_file.image_path), int(page)
+
+
+def _locate_micromanager_page(image_file, plane) -> PageLocation | None:
+    # same arithmetic as MicroManagerSingleImageStack._image, planes are spread over several files of the acquisition
+    if image_file.error_loading_metadata:
+        return None
+    c, z, t = [int(g) for g in re.search(r'^c([0-9]*)z([0-9]*)t([0-9]*)$', plane).groups()]
+    key = (f"c{c:0{len(str(image_file.n_channels))}d}"
+           f"z{z:0{len(str(image_file.n_zstacks))}d}"
+           f"t{t:0{len(str(image_file.n_frames))}d}")
+    ix = image_file.all_planes_md_dict[key]
+    filename = image_file.files[ix]
+    fprev_set = set(np.unique(image_file.files[:ix + 1])) - {filename}
+    ix -= int(np.sum([image_file.frames_per_file[f] for f in fprev_set]))
+    return Path(image_file.image_path).parent / filename, ix
+
+
+# readers of fileops whose planes are single TIFF pages, by class name
+page_locators: Dict[str, Callable[[ImageFile, object], PageLocation | None]] = {
+    'TifffileOMEImageFile':         _locate_ome_page,
+    'MicroManagerSingleImageStack': _locate_micromanager_page,
+}
+
+
+class _MappedTiff:
+    def __init__(self, path: Path):
+        self.path = path
+        st = os.stat(path)
+        self.identity = (st.st_size, st.st_mtime_ns)
+        self.pages: Dict[int, Tuple[int, tuple, np.dtype] | None] = dict()
+        self._buffer: np.memmap | None = None
+        self._tif = tf.TiffFile(path)
+
+    def view(self, page: int) -> np.ndarray | None:
+        if page not in self.pages:
+            pg = self._tif.pages[page]
+            if pg.is_memmappable:
+                self.pages[page] = (pg.dataoffsets[0], pg.shape, pg.dtype.newbyteorder(self._tif.byteorder))
+            else:
+                self.pages[page] = None
+        if self.pages[page] is None:
+            return None
+        if self._buffer is None:
+            self._buffer = np.memmap(self.path, dtype=np.uint8, mode='r')
+        offset, shape, dtype = self.pages[page]
+        return np.ndarray(shape, dtype=dtype, buffer=self._buffer, offset=offset)
+
+    def close(self):
+        # views handed out keep the memory map alive until they are released
+        self._buffer = None
+        self._tif.close()
+
+
+class PlaneMemmap:
+    """
+    Gives read-only views of image planes stored uncompressed in TIFF files, backed by a memory map of the file, so
+    that planes are read by the OS on demand instead of being decoded into fresh arrays. Planes of readers not listed
+    in page_locators, or stored compressed or in strips, aren't mappable and are read by the image file as usual.
+    At most max_files files are kept open, closing the least recently used ones first.
+    """
+
+    def __init__(self, max_files=32):
+        self.max_files = max_files
+        self._files: OrderedDict[Path, _MappedTiff] = OrderedDict()
+        self._unmappable = set()
+        self._lock = threading.Lock()
+
+    def _mapped(self, path: Path) -> _MappedTiff:
+        mt = self._files.get(path)
+        if mt is not None:
+            st = os.stat(path)
+            if (st.st_size, st.st_mtime_ns) == mt.identity:
+                self._files.move_to_end(path)
+                return mt
+            self._close(path)
+        mt = self._files[path] = _MappedTiff(path)
+        while len(self._files) > self.max_files:
+            self._close(next(iter(self._files)))
+        return mt
+
+    def _close(self, path: Path):
+        self._files.pop(path).close()
+        self._unmappable = {loc for loc in self._unmappable if loc[0] != path}
+
+    def plane(self, image_file: ImageFile, ix: int) -> np.ndarray | None:
+        locate = page_locators.get(image_file.__class__.__name__)
+        if locate is None or ix is None:
+            return None
+        try:
+            loc = locate(image_file, image_file.all_planes[ix])
+            if loc is None or loc in self._unmappable:
+                return None
+            with self._lock:
+                img = self._mapped(loc[0]).view(loc[1])
+                if img is None:
+                    self._unmappable.add(loc)
+        except (KeyError, IndexError, AttributeError, OSError, ValueError) as e:
+            logger.debug(f"Plane {ix} of {image_file.image_path} can't be memory-mapped ({e}).")
+            return None
+        return img
+
+    def clear(self):
+        with self._lock:
+            for mt in self._files.values():
+                mt.close()
+            self._files.clear()
+            self._unmappable.clear()
+
+
+# memory maps are shared between all pipelines of the process
+plane_memmap = PlaneMemmap()
+
+
+def memmap_plane(image_file: ImageFile, ix: int) -> np.ndarray | None:
+    return plane_memmap.plane(image_file, ix)
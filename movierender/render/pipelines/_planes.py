@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+from fileops.image import ImageFile
+
+from movierender.render.pipelines._memmap import memmap_plane
+from movierender.render.pipelines._projection_cache import projection_cache, is_projection
+
+logger = logging.getLogger(__name__)
+
+
+def read_plane(image_file: ImageFile, frame: int, channel: int, zstack) -> np.ndarray | None:
+    """
+    Read the image plane of a frame and channel; zstack is either the index of a focal plane or the name of a
+    z-projection (e.g. "all-max"). Planes stored uncompressed in TIFF files are returned as read-only views of a memory
+    map of the file (see PlaneMemmap).
+    """
+    if type(zstack) is int:
+        ix = image_file.ix_at(c=channel, z=zstack, t=frame)
+        logger.debug(f"Retrieving frame {frame} of channel {channel} at z-stack={zstack} (index={ix})")
+        img = memmap_plane(image_file, ix)
+        if img is not None:
+            return img
+        mimg = image_file.image(ix)
+        if mimg is not None:
+            return mimg.image
+        return None
+    elif type(zstack) is str:
+        if is_projection(zstack):
+            logger.debug(f"Retrieving {zstack} z projection of frame {frame} and channel {channel}")
+            return projection_cache.get(image_file, frame, channel, projection=zstack)
+        return None
+    return None
+
+
+def block_mean(img: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Downsample the image by averaging blocks of factor×factor pixels; rows and columns that don't fill a whole block
+    are dropped. Integer images keep their data type, with the averages rounded.
+    """
+    if factor <= 1 or img is None:
+        return img
+    h, w = img.shape[0] // factor, img.shape[1] // factor
+    blocks = img[0:h * factor, 0:w * factor].reshape(h, factor, w, factor, *img.shape[2:])
+    if np.issubdtype(img.dtype, np.integer):
+        n = factor * factor
+        total = blocks.sum(axis=(1, 3), dtype=np.int64)
+        return ((total + n // 2) // n).astype(img.dtype)
+    return blocks.mean(axis=(1, 3), dtype=np.float64).astype(img.dtype, copy=False)
@@ -0,0 +1,76 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Tuple
+
+import numpy as np
+
+PlaneKey = Tuple[int, int, object]  # (frame, channel, zstack)
+
+
+class PlanePrefetcher:
+    """
+    Reads image planes ahead of the renderer on a thread pool.
+    The order in which planes are needed is known up front, so up to depth planes following the one being drawn are
+    kept in a ring buffer. Planes requested outside of the plan are read synchronously.
+    """
+
+    def __init__(self, read_fn: Callable[[int, int, object], np.ndarray], plan: Iterable[PlaneKey],
+                 depth=8, workers=1):
+        self._read = read_fn
+        self._plan = list(OrderedDict.fromkeys(plan))  # planes shared between pipelines are read only once
+        self._plan_ix = {key: ix for ix, key in enumerate(self._plan)}
+        self._pos = 0
+        self._buffer: OrderedDict = OrderedDict()
+        self.depth = max(depth, 1)
+        self.logger = logging.getLogger(__name__)
+
+        # a single worker by default, as not all image file readers are safe to use from several threads
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="PlanePrefetcher")
+        self._fill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fill(self):
+        while len(self._buffer) < self.depth and self._pos < len(self._plan):
+            key = self._plan[self._pos]
+            self._buffer[key] = self._executor.submit(self._read, *key)
+            self._pos += 1
+
+    def get(self, frame: int, channel: int, zstack) -> np.ndarray:
+        key = (frame, channel, zstack)
+        if key not in self._buffer:
+            self.logger.debug(f"plane {key} not prefetched, reading it now")
+            if self._plan_ix.get(key, -1) >= self._pos:
+                # the renderer skipped ahead in the plan, so restart prefetching from the requested plane onwards
+                self._discard()
+                self._pos = self._plan_ix[key] + 1
+                self._fill()
+            return self.read(*key)
+
+        # planes planned before the requested one are not going to be needed anymore
+        while next(iter(self._buffer)) != key:
+            self._buffer.popitem(last=False)
+        future = self._buffer[key]
+        self._fill()
+        return future.result()
+
+    def read(self, frame: int, channel: int, zstack) -> np.ndarray:
+        """
+        Read a plane outside of the plan. Reads go through the workers of the prefetcher, so that the image file is
+        never read by two threads at once.
+        """
+        return self._executor.submit(self._read, frame, channel, zstack).result()
+
+    def _discard(self):
+        for future in self._buffer.values():
+            future.cancel()
+        self._buffer.clear()
+
+    def close(self):
+        self._discard()
+        self._executor.shutdown(wait=True)
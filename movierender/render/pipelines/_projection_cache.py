@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from fileops.image import ImageFile
+from fileops.image.imagemeta import MetadataImage
+from fileops.pathutils import ensure_dir
+
+from movierender.render.pipelines._zprojection import parse_projection, is_projection, z_projection
+
+
+class ProjectionCache:
+    """
+    Keeps z-projections of image planes in memory, keyed by image file, frame, channel and kind of projection.
+    The least recently used projections are evicted once the cache holds more than max_bytes. If a folder is given,
+    projections are also stored there as .npy files so that later renders of the same data skip projecting again.
+    """
+
+    def __init__(self, max_bytes=1024 ** 3, folder=None):
+        self.max_bytes = max_bytes
+        self.folder = Path(folder) if folder is not None else None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.logger = logging.getLogger(__name__)
+
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(image_file: ImageFile, frame: int, channel: int, projection) -> tuple:
+        prj, zrange = parse_projection(projection) if type(projection) is str else (projection, None)
+        zrange = (zrange.start, zrange.stop) if zrange is not None else None
+        return str(image_file.image_path), image_file.series, int(frame), int(channel), prj.name, zrange
+
+    def _disk_path(self, image_file: ImageFile, key: tuple) -> Path:
+        # the modification time and size of the file are part of the name, so edited files are projected again
+        st = os.stat(image_file.image_path)
+        ident = "|".join(str(k) for k in key + (st.st_size, st.st_mtime_ns))
+        return self.folder / f"{hashlib.sha1(ident.encode()).hexdigest()}.npy"
+
+    def _put(self, key, img: np.ndarray):
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = img
+            self.nbytes += img.nbytes
+            while self.nbytes > self.max_bytes and len(self._cache) > 1:
+                _, old = self._cache.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def get(self, image_file: ImageFile, frame: int, channel: int, projection='all-max') -> np.ndarray:
+        key = self._key(image_file, frame, channel, projection)
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+
+        path = self._disk_path(image_file, key) if self.folder is not None else None
+        if path is not None and path.exists():
+            self.logger.debug(f"Loading z projection of frame {frame} and channel {channel} from {path}")
+            img = np.load(path)
+        else:
+            img = z_projection(image_file, frame, channel, projection=projection)
+            if path is not None:
+                np.save(ensure_dir(self.folder) / path.name, img)
+
+        self._put(key, img)
+        return img
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.nbytes = 0
+
+
+# projections are shared between all pipelines and panels rendered by the process
+projection_cache = ProjectionCache(folder=os.environ.get("MOVIERENDER_PROJECTION_CACHE", None))
+
+
+def cached_z_projection(image_file: ImageFile, frame: int, channel: int, projection='all-max') -> MetadataImage:
+    img = projection_cache.get(image_file, frame, channel, projection=projection)
+    return MetadataImage(reader='ProjectionCache',
+                         image=img,
+                         pix_per_um=image_file.pix_per_um, um_per_pix=image_file.um_per_pix,
+                         frame=frame, timestamp=None, time_interval=None,
+                         channel=channel, z=None,
+                         width=image_file.width, height=image_file.height,
+                         intensity_range=[np.min(img), np.max(img)])
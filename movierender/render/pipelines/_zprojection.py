@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import re
+from typing import Tuple
+
+import numpy as np
+from fileops.image import ImageFile
+from fileops.image.exceptions import FrameNotFoundError
+from fileops.image.ops import zprojection_from_str, ZProjection
+
+from movierender.render.pipelines._memmap import memmap_plane
+
+logger = logging.getLogger(__name__)
+
+_zrange_rgx = re.compile(r'^([0-9]+)\.\.([0-9]+)-(.+)$')
+
+
+def parse_projection(zstack) -> Tuple[ZProjection | None, range | None]:
+    """
+    Return the kind of z-projection and the focal planes it spans, given either as the name of the projection over
+    all planes (e.g. "all-max") or over a range of planes written as in the frames of configuration files, with both
+    ends included (e.g. "3..12-max"). The range is None when all planes are projected.
+    """
+    if type(zstack) is not str:
+        return None, None
+    rgx = _zrange_rgx.match(zstack)
+    if rgx is not None:
+        z0, z1, prj = rgx.groups()
+        if int(z1) < int(z0):
+            raise ValueError(f"Range of focal planes in {zstack} is empty.")
+        return zprojection_from_str(f"all-{prj}"), range(int(z0), int(z1) + 1)
+    return zprojection_from_str(zstack), None
+
+
+def is_projection(zstack) -> bool:
+    return parse_projection(zstack)[0] not in (None, ZProjection.UNSPECIFIED)
+
+
+def _planes(image_file: ImageFile, frame: int, channel: int, zrange: range | None):
+    # yields the planes of the stack one at a time, so that at most one of them is held in memory
+    zstacks = zrange if zrange is not None else range(image_file.n_zstacks)
+    for zs in zstacks:
+        ix = image_file.ix_at(channel, zs, frame)
+        if ix is None:
+            continue
+        img = memmap_plane(image_file, ix)
+        if img is None:
+            mimg = image_file.image(ix)
+            if mimg is None:
+                raise FrameNotFoundError(f"image not found in the file at t={frame} c={channel} z={zs}.")
+            img = mimg.image
+        yield img
+
+
+def z_projection(image_file: ImageFile, frame: int, channel: int, projection='all-max') -> np.ndarray:
+    """
+    Project the focal planes of a frame and channel by reducing them one plane at a time into a running accumulator
+    (Welford's algorithm for the standard deviation), so that memory doesn't grow with the depth of the stack. Results
+    have the same type as the projections of fileops; medians can't be computed this way and stack the planes instead.
+    """
+    prj, zrange = parse_projection(projection) if type(projection) is str else (projection, None)
+    logger.debug(f"Streaming {prj.name} z projection of frame {frame} and channel {channel}")
+    planes = _planes(image_file, frame, channel, zrange)
+
+    if prj == ZProjection.MEDIAN:
+        imgs = list(planes)
+        if len(imgs) == 0:
+            raise FrameNotFoundError(f"no planes to project at t={frame} c={channel}.")
+        return np.median(np.stack(imgs), axis=0)
+
+    out = mean = m2 = delta = tmp = None
+    n = 0
+    for img in planes:
+        n += 1
+        if prj in (ZProjection.MAX, ZProjection.MIN):
+            if out is None:
+                out = np.array(img)
+            else:
+                (np.maximum if prj == ZProjection.MAX else np.minimum)(out, img, out=out)
+        elif prj in (ZProjection.SUM, ZProjection.MEAN):
+            if out is None:
+                # same accumulator type as np.sum of the stacked planes
+                out = np.zeros(img.shape, dtype=np.sum(img[0:1, 0:1]).dtype)
+            np.add(out, img, out=out)
+        elif prj == ZProjection.STD:
+            if mean is None:
+                mean, m2, delta, tmp = [np.zeros(img.shape, dtype=np.float64) for _ in range(4)]
+            np.subtract(img, mean, out=delta)
+            np.divide(delta, n, out=tmp)
+            mean += tmp
+            # m2 += (x - previous mean) * (x - updated mean)
+            np.subtract(img, mean, out=tmp)
+            np.multiply(delta, tmp, out=tmp)
+            m2 += tmp
+        else:
+            raise ValueError(f"Projection {projection} not supported.")
+
+    if n == 0:
+        raise FrameNotFoundError(f"no planes to project at t={frame} c={channel}.")
+    if prj == ZProjection.MEAN:
+        return out / n
+    if prj == ZProjection.STD:
+        return np.sqrt(m2 / n, out=m2)
+    return out
@@ -0,0 +1,19 @@
+import logging
+
+import typer
+from typing_extensions import Annotated
+
+log = logging.getLogger('clean-cache')
+
+
+def clean_cache_cmd(
+        max_size_mb: Annotated[
+            float, typer.Option(help="Size in MB that the frame cache is trimmed down to, "
+                                     "deleting the least recently used frames first")] = 0,
+):
+    from movierender.render import frame_cache
+
+    size = frame_cache.nbytes
+    deleted = frame_cache.evict(max_bytes=int(max_size_mb * 1024 ** 2))
+    log.info(f"Deleted {deleted} frames from {frame_cache.folder}, "
+             f"{size / 1024 ** 2:.1f}MB -> {frame_cache.nbytes / 1024 ** 2:.1f}MB.")
@@ -0,0 +1,43 @@
+import logging
+from pathlib import Path
+from typing import List
+
+import typer
+from typing_extensions import Annotated
+
+log = logging.getLogger('concat')
+
+
+def concat_cmd(
+        segments: Annotated[
+            List[Path], typer.Argument(help="Segments of the movie rendered with --frames or --shard, "
+                                            "in the order they are joined")],
+        output: Annotated[
+            Path, typer.Option(help="Name of the file of the joined movie")],
+        overwrite_movie_file: Annotated[
+            bool, typer.Option(help="Set true if you want to overwrite the file")] = False,
+        codec: Annotated[
+            str, typer.Option(help="Encode the segments again with this codec (libx264 by default) instead of copying "
+                                   "them, e.g. to turn lossless ffv1 segments into an mp4")] = None,
+        preset: Annotated[
+            str, typer.Option(help="Encoder preset, if segments are encoded again")] = None,
+        crf: Annotated[
+            int, typer.Option(help="Constant rate factor of the encoder, if segments are encoded again")] = None,
+        bitrate: Annotated[
+            str, typer.Option(help="Bitrate of the movie, if segments are encoded again")] = None,
+        encoder_threads: Annotated[
+            int, typer.Option(help="Number of threads of the encoder, if segments are encoded again")] = None,
+        gop: Annotated[
+            int, typer.Option(help="Maximum number of frames between keyframes, if segments are encoded again")] = None,
+):
+    from movierender.render import EncoderSettings, concat_segments
+
+    if output.exists() and not overwrite_movie_file:
+        log.warning(f"File {output} already exists.")
+        return
+
+    # segments are copied as they are, unless settings of the encoder are given
+    settings = dict(codec=codec, preset=preset, crf=crf, bitrate=bitrate, threads=encoder_threads, gop=gop)
+    encoder = EncoderSettings().updated(**settings) if any(v is not None for v in settings.values()) else None
+    concat_segments(segments, output, encoder=encoder)
+    log.info(f"Joined {len(segments)} segments into {output}.")
@@ -0,0 +1,58 @@
+import typer
+from typing_extensions import Annotated
+
+# options shared by the commands that render movies, so that each one is defined once and reads the same in every help
+Workers = Annotated[
+    int, typer.Option(help="Number of processes used to render the frames of each movie and the tiles of each panel; "
+                           "movies get at most one per 24 frames, as starting a process takes about as long as "
+                           "rendering that many frames")]
+Threads = Annotated[
+    bool, typer.Option(help="Render the frames of each movie in threads instead of processes")]
+Retained = Annotated[
+    bool, typer.Option(help="Draw the layout of each movie once, and only update its images and moving overlays on "
+                            "every frame")]
+Backend = Annotated[
+    str, typer.Option(help="Draw the frames with matplotlib, or with raster for layouts made only of images, "
+                           "scale bars, timestamps and text")]
+CacheFrames = Annotated[
+    bool, typer.Option(help="Reuse frames rendered before with the same configuration")]
+Profile = Annotated[
+    str, typer.Option(help="Write a report of the time and memory spent per stage of rendering "
+                           "next to each movie, either as json or csv")]
+Resolution = Annotated[
+    str, typer.Option(help="Resolution of the movies, either 720p, 1080p, 4k or native "
+                           "(one pixel per pixel of the images)")]
+Codec = Annotated[
+    str, typer.Option(help="Video codec, either libx264, libx265, libvpx-vp9 or ffv1 (lossless)")]
+Preset = Annotated[
+    str, typer.Option(help="Encoder preset, e.g. ultrafast for previews or slow for smaller files")]
+Crf = Annotated[
+    int, typer.Option(help="Constant rate factor of the encoder, used instead of the bitrate")]
+Bitrate = Annotated[
+    str, typer.Option(help="Bitrate of the movies, e.g. 2M")]
+EncoderThreads = Annotated[
+    int, typer.Option(help="Number of threads of the encoder")]
+Gop = Annotated[
+    int, typer.Option(help="Maximum number of frames between keyframes")]
+Frames = Annotated[
+    str, typer.Option(help="Render only the frames from start up to stop (excluded) into a segment of each "
+                           "movie, given as start:stop")]
+Shard = Annotated[
+    str, typer.Option(help="Render only a shard of the frames into a segment of each movie, given as "
+                           "index/count with index counted from zero (e.g. 3/8)")]
+Jobs = Annotated[
+    int, typer.Option(help="Number of movies and panels rendered at the same time")]
+MaxMemoryMb = Annotated[
+    float, typer.Option(help="Bound on the memory of each process rendering a movie or panel")]
+
+
+def render_options(workers=1, threads=False, retained=False, backend='matplotlib', cache_frames=False, profile=None,
+                   resolution=None, codec=None, preset=None, crf=None, bitrate=None, encoder_threads=None, gop=None,
+                   frames=None, shard=None) -> dict:
+    """
+    Return the keyword arguments of render_movie given by the options of a command.
+    """
+    return dict(workers=workers, threads=threads, retained=retained, backend=backend, cache_frames=cache_frames,
+                profile=profile, resolution=resolution,
+                encoder=dict(codec=codec, preset=preset, crf=crf, bitrate=bitrate, threads=encoder_threads, gop=gop),
+                frames=frames, shard=shard)
@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 from pathlib import Path
@@ -5,15 +6,12 @@ from pathlib import Path
 import typer
 from typing_extensions import Annotated
 
-from movierender.layouts import render_static_montage
-from movierender.scripts._render_movie import render_movie
+from movierender.scripts import _options as opt
+from movierender.scripts._scheduler import expand_jobs, run_jobs
 
 sys.path.append(Path(os.path.realpath(__file__)).parent.parent.parent.as_posix())
 
-from fileops.export.config import read_config
-from fileops.logger import get_logger, silence_loggers
-
-log = get_logger(name='render-movie')
+log = logging.getLogger('render-movie')
 
 
 def render_configuration_file_cmd(
@@ -23,23 +21,42 @@ def render_configuration_file_cmd(
             bool, typer.Argument(help="To show file metadata information before rendering the movie")] = True,
         overwrite_movie_file: Annotated[
             bool, typer.Option(help="Set true if you want to overwrite the file")] = False,
+        workers: opt.Workers = 1,
+        threads: opt.Threads = False,
+        retained: opt.Retained = False,
+        backend: opt.Backend = 'matplotlib',
+        cache_frames: opt.CacheFrames = False,
+        profile: opt.Profile = None,
+        resolution: opt.Resolution = None,
+        codec: opt.Codec = None,
+        preset: opt.Preset = None,
+        crf: opt.Crf = None,
+        bitrate: opt.Bitrate = None,
+        encoder_threads: opt.EncoderThreads = None,
+        gop: opt.Gop = None,
+        frames: opt.Frames = None,
+        shard: opt.Shard = None,
+        jobs: opt.Jobs = 1,
+        max_memory_mb: opt.MaxMemoryMb = None,
 ):
     if cfg_path.parent.name[0:3] == "bad":
         return
 
-    log.info(f"Reading configuration file {cfg_path}")
-    cfg = read_config(cfg_path)
-
-    # make movies specified in configuration file
-    for mov in cfg.movies:
-        silence_loggers(loggers=[mov.image_file.__class__.__name__], output_log_file="silenced.log")
-        if show_file_info:
-            log.info(f"file {cfg_path}\r\n{mov.image_file.info.squeeze(axis=0)}")
-        render_movie(mov, overwrite=overwrite_movie_file)
-
-    # render panels specified in configuration file
-    for pan in cfg.panels:
-        silence_loggers(loggers=[pan.image_file.__class__.__name__], output_log_file="silenced.log")
-        if show_file_info:
-            log.info(f"file {cfg_path}\r\n{pan.image_file.info.squeeze(axis=0)}")
-        render_static_montage(pan, row=pan.rows, col=pan.columns)
+    if show_file_info:
+        from fileops.export.config import read_config
+        from fileops.logger import silence_loggers
+
+        log.info(f"Reading configuration file {cfg_path}")
+        cfg = read_config(cfg_path)
+        for section in cfg.movies + cfg.panels:
+            silence_loggers(loggers=[section.image_file.__class__.__name__], output_log_file="silenced.log")
+            log.info(f"file {cfg_path} ({section.header})\r\n{section.image_file.info.squeeze(axis=0)}")
+
+    options = opt.render_options(workers=workers, threads=threads, retained=retained, backend=backend,
+                                 cache_frames=cache_frames, profile=profile, resolution=resolution, codec=codec,
+                                 preset=preset, crf=crf, bitrate=bitrate, encoder_threads=encoder_threads, gop=gop,
+                                 frames=frames, shard=shard)
+    # render movies and panels specified in configuration file
+    results = run_jobs(expand_jobs([cfg_path], overwrite=overwrite_movie_file, options=options),
+                       n_jobs=jobs, max_memory_mb=max_memory_mb)
+    return results
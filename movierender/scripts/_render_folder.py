@@ -1,32 +1,53 @@
+import logging
 from pathlib import Path
 
 import typer
-from fileops.export.config import search_config_files
-from fileops.logger import get_logger
 from typing_extensions import Annotated
 
-from movierender.scripts.render import render_configuration_file_cmd
+from movierender.scripts import _options as opt
+from movierender.scripts._scheduler import expand_jobs, run_jobs
 
-log = get_logger(name='render-folder')
+log = logging.getLogger('render-folder')
 
 
 def render_folder_cmd(
         path: Annotated[
             Path, typer.Argument(help="Path where configuration files are located. "
                                       "If no path is given, the current folder will be used.")] = None,
+        overwrite_movie_file: Annotated[
+            bool, typer.Option(help="Set true if you want to overwrite the file")] = False,
+        workers: opt.Workers = 1,
+        threads: opt.Threads = False,
+        retained: opt.Retained = False,
+        backend: opt.Backend = 'matplotlib',
+        cache_frames: opt.CacheFrames = False,
+        profile: opt.Profile = None,
+        resolution: opt.Resolution = None,
+        codec: opt.Codec = None,
+        preset: opt.Preset = None,
+        crf: opt.Crf = None,
+        bitrate: opt.Bitrate = None,
+        encoder_threads: opt.EncoderThreads = None,
+        gop: opt.Gop = None,
+        frames: opt.Frames = None,
+        shard: opt.Shard = None,
+        jobs: opt.Jobs = 1,
+        max_memory_mb: opt.MaxMemoryMb = None,
 ):
+    from fileops.export.config import search_config_files
+
     if path is None:
         log.info(f"No path provided")
         path = Path('.').absolute()
     cfg_path_list = search_config_files(path)
+    log.info(f"Found {len(cfg_path_list)} configuration files in {path}")
 
-    total_rendered = 0
-    for cfg_path in cfg_path_list:
-        if cfg_path.parent.name[0:3] == "bad":
-            continue
-
-        log.info(f"Reading configuration file {cfg_path}")
-        render_configuration_file_cmd(cfg_path)
-        total_rendered += 1
+    options = opt.render_options(workers=workers, threads=threads, retained=retained, backend=backend,
+                                 cache_frames=cache_frames, profile=profile, resolution=resolution, codec=codec,
+                                 preset=preset, crf=crf, bitrate=bitrate, encoder_threads=encoder_threads, gop=gop,
+                                 frames=frames, shard=shard)
+    results = run_jobs(expand_jobs(cfg_path_list, overwrite=overwrite_movie_file, options=options),
+                       n_jobs=jobs, max_memory_mb=max_memory_mb)
 
+    total_rendered = len([r for r in results if r.status == 'done'])
     return total_rendered
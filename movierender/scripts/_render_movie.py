@@ -1,26 +1,50 @@
+import logging
 import os
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 from typing_extensions import Annotated
 
-from movierender.layouts import LayoutColumnComposer, LayoutCompositeComposer
+from movierender.scripts import _options as opt
 
 sys.path.append(Path(os.path.realpath(__file__)).parent.parent.parent.as_posix())
 
-from fileops.export.config import read_config, ConfigMovie
-from fileops.logger import get_logger, silence_loggers
+if TYPE_CHECKING:
+    from fileops.export.config import ConfigMovie
 
-log = get_logger(name='render-movie')
+log = logging.getLogger('render-movie')
 
 
-def render_movie(mov: ConfigMovie, overwrite=False):
+def render_movie(mov: 'ConfigMovie', overwrite=False, workers=1, threads=False, retained=False, backend='matplotlib',
+                 cache_frames=False, profile=None, resolution=None, encoder: dict = None, frames: str = None,
+                 shard: str = None):
+    """
+    Render a movie with the layout given in its configuration. Options are those of the commands (see render_options),
+    and are turned into arguments of the layout composers only here.
+    """
+    from movierender.layouts import LayoutColumnComposer, LayoutCompositeComposer
+    from movierender.render import parse_frames, shard_frames, read_encoder_settings
+
+    # a range or shard of the frames is rendered into a segment of the movie, to be joined later by concat
+    selected = None
+    if frames is not None or shard is not None:
+        selected = parse_frames(mov.frames, frames) if frames is not None else sorted(mov.frames)
+        if shard is not None:
+            gop = read_encoder_settings(mov).updated(**(encoder if encoder is not None else dict())).gop
+            selected = shard_frames(selected, shard, gop=gop)
+        if len(selected) == 0:
+            log.warning(f"no frames to render in {mov.movie_filename} for the range or shard given")
+            return
+
     if len(mov.image_file.frames) == 1:
         log.warning("only one frame, skipping static image")
         return
     elif len(mov.image_file.frames) > 1:
-        mv_kwargs = dict(overwrite=overwrite)
+        mv_kwargs = dict(overwrite=overwrite, workers=workers, threads=threads, retained=retained, backend=backend,
+                         cache_frames=cache_frames, profile=profile, resolution=resolution, encoder=encoder,
+                         frames=selected)
         # what follows is a list of supported layouts
         if mov.layout in ["twoch", "two-ch"]:
             lytcomposer = LayoutColumnComposer(mov, columns=2, **mv_kwargs)
@@ -40,15 +64,37 @@ def render_movie_cmd(
             bool, typer.Argument(help="To show file metadata information before rendering the movie")] = True,
         overwrite_movie_file: Annotated[
             bool, typer.Option(help="Set true if you want to overwrite the file")] = False,
+        workers: opt.Workers = 1,
+        threads: opt.Threads = False,
+        retained: opt.Retained = False,
+        backend: opt.Backend = 'matplotlib',
+        cache_frames: opt.CacheFrames = False,
+        profile: opt.Profile = None,
+        resolution: opt.Resolution = None,
+        codec: opt.Codec = None,
+        preset: opt.Preset = None,
+        crf: opt.Crf = None,
+        bitrate: opt.Bitrate = None,
+        encoder_threads: opt.EncoderThreads = None,
+        gop: opt.Gop = None,
+        frames: opt.Frames = None,
+        shard: opt.Shard = None,
 ):
+    from fileops.export.config import read_config
+    from fileops.logger import silence_loggers
+
     if cfg_path.parent.name[0:3] == "bad":
         return
     log.info(f"Reading configuration file {cfg_path}")
     cfg = read_config(cfg_path)
 
+    options = opt.render_options(workers=workers, threads=threads, retained=retained, backend=backend,
+                                 cache_frames=cache_frames, profile=profile, resolution=resolution, codec=codec,
+                                 preset=preset, crf=crf, bitrate=bitrate, encoder_threads=encoder_threads, gop=gop,
+                                 frames=frames, shard=shard)
     # make movies specified in configuration file
     for mov in cfg.movies:
         silence_loggers(loggers=[mov.image_file.__class__.__name__], output_log_file="silenced.log")
         if show_file_info:
-            log.info(f"file {cfg_path}\r\n{nfo.squeeze(axis=0)}")
-        render_movie(mov, overwrite=overwrite_movie_file)
+            log.info(f"file {cfg_path}\r\n{mov.image_file.info.squeeze(axis=0)}")
+        render_movie(mov, overwrite=overwrite_movie_file, **options)
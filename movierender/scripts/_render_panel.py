@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 from pathlib import Path
@@ -5,14 +6,11 @@ from pathlib import Path
 import typer
 from typing_extensions import Annotated
 
-from movierender.layouts import render_static_montage
+from movierender.scripts import _options as opt
 
 sys.path.append(Path(os.path.realpath(__file__)).parent.parent.parent.as_posix())
 
-from fileops.export.config import read_config
-from fileops.logger import get_logger, silence_loggers
-
-log = get_logger(name='render-panel')
+log = logging.getLogger('render-panel')
 
 
 def render_panel_cmd(
@@ -22,7 +20,12 @@ def render_panel_cmd(
             bool, typer.Argument(help="To show file metadata information before rendering the movie")] = True,
         # overwrite_movie_file: Annotated[
         #     bool, typer.Option(help="Set true if you want to overwrite the file")] = False,
+        workers: opt.Workers = 1,
 ):
+    from fileops.export.config import read_config
+    from fileops.logger import silence_loggers
+    from movierender.layouts import render_static_montage
+
     if cfg_path.parent.name[0:3] == "bad":
         return
 
@@ -34,4 +37,4 @@ def render_panel_cmd(
         silence_loggers(loggers=[pan.image_file.__class__.__name__], output_log_file="silenced.log")
         if show_file_info:
             log.info(f"file {cfg_path}\r\n{pan.image_file.info.squeeze(axis=0)}")
-        render_static_montage(pan, row=pan.rows, col=pan.columns)
+        render_static_montage(pan, row=pan.rows, col=pan.columns, workers=workers)
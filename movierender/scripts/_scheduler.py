@@ -0,0 +1,138 @@
+import configparser
+import logging
+import multiprocessing
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, NamedTuple, Iterable
+
+log = logging.getLogger('render-scheduler')
+
+
+class RenderJob(NamedTuple):
+    cfg_path: Path
+    kind: str  # either 'movie' or 'panel'
+    header: str
+    overwrite: bool = False
+    options: dict = None  # keyword arguments of render_movie given by the options of the command (see render_options)
+
+    def __str__(self):
+        return f"{self.kind} {self.header} of {self.cfg_path}"
+
+
+class JobResult(NamedTuple):
+    job: RenderJob
+    status: str  # either 'done', 'skipped' or 'failed'
+    message: str = ''
+
+
+def expand_jobs(cfg_paths: Iterable[Path], movies=True, panels=True, **job_kwargs) -> List[RenderJob]:
+    """
+    Return one job per movie and panel section of the configuration files.
+    Only section headers are read, so that image files are opened by the process rendering each job.
+    """
+    jobs = list()
+    for cfg_path in cfg_paths:
+        if cfg_path.parent.name[0:3] == "bad":
+            continue
+        cfg = configparser.ConfigParser()
+        cfg.read(cfg_path)
+        for section in cfg.sections():
+            # sections are recognized in the same way as fileops.export.config does
+            if movies and section[:5].upper() == "MOVIE":
+                jobs.append(RenderJob(cfg_path.absolute(), 'movie', section, **job_kwargs))
+            elif panels and section[:5].upper() == "PANEL":
+                jobs.append(RenderJob(cfg_path.absolute(), 'panel', section, **job_kwargs))
+    return jobs
+
+
+def _limit_memory(max_memory_mb):
+    if max_memory_mb is None:
+        return
+    try:
+        import resource
+    except ImportError:
+        log.warning("Memory of render jobs can't be bounded on this platform.")
+        return
+    limit = int(max_memory_mb * 1024 ** 2)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def run_job(job: RenderJob) -> JobResult:
+    # imported here so that the parent process doesn't need to load the rendering stack
+    from fileops.export.config import read_config_movie, read_config_panel
+    from fileops.logger import silence_loggers
+    from movierender.layouts import render_static_montage
+    from movierender.scripts._render_movie import render_movie
+
+    options = job.options if job.options is not None else dict()
+    try:
+        if job.kind == 'movie':
+            mov = [m for m in read_config_movie(job.cfg_path) if m.header == job.header][0]
+            silence_loggers(loggers=[mov.image_file.__class__.__name__], output_log_file="silenced.log")
+            if len(mov.image_file.frames) <= 1:
+                return JobResult(job, 'skipped', "only one frame")
+            render_movie(mov, overwrite=job.overwrite, **options)
+        else:
+            pan = [p for p in read_config_panel(job.cfg_path) if p.header == job.header][0]
+            silence_loggers(loggers=[pan.image_file.__class__.__name__], output_log_file="silenced.log")
+            render_static_montage(pan, row=pan.rows, col=pan.columns, workers=options.get('workers', 1))
+    except FileExistsError:
+        return JobResult(job, 'skipped', "file already exists")
+    except MemoryError:
+        return JobResult(job, 'failed', "out of memory")
+    except Exception as e:
+        log.debug(traceback.format_exc())
+        return JobResult(job, 'failed', f"{e.__class__.__name__}: {e}")
+    return JobResult(job, 'done')
+
+
+def run_jobs(jobs: List[RenderJob], n_jobs=1, max_memory_mb=None) -> List[JobResult]:
+    """
+    Render jobs across n_jobs processes and log a summary of the results.
+    Every job runs in a fresh process, with its address space bounded to max_memory_mb if given, so that memory isn't
+    carried over between jobs.
+    """
+    results = list()
+    if n_jobs <= 1 and max_memory_mb is None:
+        for job in jobs:
+            log.info(f"Rendering {job}")
+            results.append(run_job(job))
+    else:
+        # every job gets a pool of its own single process, which is shut down once the job is done
+        # (max_tasks_per_child would do the same in a shared pool, but needs Python 3.11)
+        queue = deque(jobs)
+        running = dict()
+        while len(queue) > 0 or len(running) > 0:
+            while len(queue) > 0 and len(running) < max(1, n_jobs):
+                job = queue.popleft()
+                executor = ProcessPoolExecutor(max_workers=1,
+                                               mp_context=multiprocessing.get_context('spawn'),
+                                               initializer=_limit_memory,
+                                               initargs=(max_memory_mb,))
+                running[executor.submit(run_job, job)] = (job, executor)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, executor = running.pop(future)
+                try:
+                    res = future.result()
+                except BrokenProcessPool as e:
+                    res = JobResult(job, 'failed', f"render process died ({e})")
+                executor.shutdown()
+                log.info(f"{res.status} {res.job}")
+                results.append(res)
+
+    log_summary(results)
+    return results
+
+
+def log_summary(results: List[JobResult]):
+    by_status = {status: [r for r in results if r.status == status] for status in ('done', 'skipped', 'failed')}
+    log.info(f"Rendered {len(by_status['done'])} of {len(results)} jobs, "
+             f"skipped {len(by_status['skipped'])}, failed {len(by_status['failed'])}.")
+    for r in by_status['skipped']:
+        log.info(f"skipped {r.job}: {r.message}")
+    for r in by_status['failed']:
+        log.error(f"failed {r.job}: {r.message}")
@@ -1,19 +1,30 @@
-from fileops.logger import get_logger, silence_loggers
 from typer import Typer
 
+# commands only import the rendering stack when they run, so that parsing arguments and showing help stay fast
+from ._clean_cache import clean_cache_cmd
+from ._concat import concat_cmd
 from ._render_configfile import render_configuration_file_cmd
 from ._render_folder import render_folder_cmd
 from ._render_movie import render_movie_cmd
 from ._render_panel import render_panel_cmd
 
-log = get_logger(name='render', debug=False)
-silence_loggers(loggers=["tifffile", "matplotlib", "PIL"], output_log_file="silenced.log")
 app = Typer()
 
+
+@app.callback()
+def setup_logging():
+    from fileops.logger import get_logger, silence_loggers
+
+    get_logger(name='render', debug=False)
+    silence_loggers(loggers=["tifffile", "matplotlib", "PIL"], output_log_file="silenced.log")
+
+
 app.command(name='file')(render_configuration_file_cmd)
 app.command(name='folder')(render_folder_cmd)
 app.command(name='movie')(render_movie_cmd)
 app.command(name='panel')(render_panel_cmd)
+app.command(name='clean-cache')(clean_cache_cmd)
+app.command(name='concat')(concat_cmd)
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,261 @@
+"""
+Benchmarks of the renderers and image pipelines on synthetic stacks.
+
+    python -m test.benchmarks.run --frames 20 --size 1024 --compare test/benchmarks/results/<previous>.json
+
+Every benchmark runs in a fresh process, so that the peak resident memory reported is its own. Results are stored as
+JSON files in test/benchmarks/results, named after the version of the code they were measured on.
+"""
+import inspect
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import typer
+from typing_extensions import Annotated
+
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+RESULTS_FOLDER = Path(__file__).parent / 'results'
+
+app = typer.Typer()
+
+
+def _movie(cfg_path: Path, header: str):
+    from fileops.export.config import read_config_movie
+    return [m for m in read_config_movie(cfg_path) if m.header == header][0]
+
+
+def _plane_bytes(mov, n_frames, n_channels) -> int:
+    imf = mov.image_file
+    return n_frames * n_channels * len(imf.zstacks) * imf.width * imf.height * 2
+
+
+def bench_sequential(cfg_path: Path, out: Path, retained=True, backend='matplotlib') -> Dict:
+    from movierender.layouts import LayoutCompositeComposer
+    mov = _movie(cfg_path, 'MOVIE-1')
+    composer = LayoutCompositeComposer(mov, overwrite=True, retained=retained, backend=backend,
+                                       prefix=f"{backend}-{retained}-")
+    composer.make_layout()
+    t0 = time.perf_counter()
+    composer.render()
+    return {'frames': len(mov.frames), 'seconds': time.perf_counter() - t0,
+            'bytes': _plane_bytes(mov, len(mov.frames), len(mov.channels))}
+
+
+def bench_parallel(cfg_path: Path, out: Path, workers=4, threads=False) -> Dict:
+    from movierender.layouts import LayoutCompositeComposer
+    mov = _movie(cfg_path, 'MOVIE-1')
+    composer = LayoutCompositeComposer(mov, overwrite=True, workers=workers, threads=threads,
+                                       prefix=f"parallel-{threads}-")
+    composer.make_layout()
+    t0 = time.perf_counter()
+    composer.render()
+    return {'frames': len(mov.frames), 'seconds': time.perf_counter() - t0,
+            'bytes': _plane_bytes(mov, len(mov.frames), len(mov.channels))}
+
+
+def _layer_renderer(mov, layer, fig=None):
+    from matplotlib.figure import Figure
+    from movierender import MovieRenderer
+
+    renderer = MovieRenderer(fig=fig if fig is not None else Figure(), config=mov, prefetch_depth=0)
+    renderer += layer
+    return renderer
+
+
+def _bench_pipeline(mov, pipeline, n_channels) -> Dict:
+    renderer = _layer_renderer(mov, pipeline)
+    frames = sorted(mov.frames)
+    t0 = time.perf_counter()
+    for fr in frames:
+        renderer.frame = fr
+        pipeline()
+    return {'frames': len(frames), 'seconds': time.perf_counter() - t0,
+            'bytes': _plane_bytes(mov, len(frames), n_channels)}
+
+
+def bench_composite_rgb(cfg_path: Path, out: Path, lut=False) -> Dict:
+    from movierender.render import CompositeRGBImage, LUTCompositeImage
+    mov = _movie(cfg_path, 'MOVIE-1')
+    cls = LUTCompositeImage if lut else CompositeRGBImage
+    pipeline = cls(zstack=mov.zstack_fn, channeldict={
+        ch['name']: {'id': cix, 'color': ch['color'][1:], 'rescale': True, 'intensity': 1.0}
+        for cix, ch in mov.channel_render_parameters.items()})
+    return _bench_pipeline(mov, pipeline, len(mov.channels))
+
+
+def bench_single_image(cfg_path: Path, out: Path) -> Dict:
+    from movierender.render import SingleImage
+    mov = _movie(cfg_path, 'MOVIE-1')
+    return _bench_pipeline(mov, SingleImage(zstack=mov.zstack_fn, channel=0), 1)
+
+
+def bench_timeseries(cfg_path: Path, out: Path, units=200, retained=True) -> Dict:
+    import numpy as np
+    import pandas as pd
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from movierender.overlays import DataTimeseries
+
+    mov = _movie(cfg_path, 'MOVIE-1')
+    frames = sorted(mov.frames)
+    rng = np.random.default_rng(0)
+    n = units * 2 * len(frames)
+    df = pd.DataFrame({
+        'unit':   np.repeat(np.arange(units), 2 * len(frames)),
+        'signal': np.tile(np.repeat(['a', 'b'], len(frames)), units),
+        'frame':  np.tile(frames, 2 * units),
+        'time':   np.tile(np.asarray(frames) * 10, 2 * units),
+        'value':  rng.normal(size=n),
+    })
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.gca()
+    t0 = time.perf_counter()
+    ovrl = DataTimeseries(df, x='time', y='value', ax=ax)
+    renderer = _layer_renderer(mov, ovrl, fig=fig)
+    for i, fr in enumerate(frames):
+        renderer.frame = fr
+        if retained and i > 0:
+            ovrl.update(ax=ax)
+        else:
+            ax.cla()
+            ovrl.plot(ax=ax)
+        fig.canvas.draw()
+    return {'frames': len(frames), 'seconds': time.perf_counter() - t0, 'bytes': int(df.memory_usage().sum())}
+
+
+def bench_static_montage(cfg_path: Path, out: Path, workers=1) -> Dict:
+    from fileops.export.config import read_config_panel
+    from movierender.layouts import render_static_montage
+
+    pan = read_config_panel(cfg_path)[0]
+    t0 = time.perf_counter()
+    render_static_montage(pan, row=pan.rows, col=pan.columns, workers=workers)
+    return {'frames': len(pan.frames), 'seconds': time.perf_counter() - t0,
+            'bytes': _plane_bytes(pan, len(pan.frames), len(pan.channels))}
+
+
+def bench_cli_import(cfg_path: Path, out: Path, runs=5) -> Dict:
+    # start-up of the command line interface in fresh interpreters, each import being counted as a frame
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        subprocess.check_call([sys.executable, '-c', 'from movierender.scripts.render import app'],
+                              cwd=Path(__file__).parent.parent.parent)
+    return {'frames': runs, 'seconds': time.perf_counter() - t0, 'bytes': 0}
+
+
+BENCHMARKS = {
+    'sequential':           (bench_sequential, dict(retained=False)),
+    'sequential-retained':  (bench_sequential, dict(retained=True)),
+    'sequential-raster':    (bench_sequential, dict(backend='raster')),
+    'parallel':             (bench_parallel, dict()),
+    'parallel-threads':     (bench_parallel, dict(threads=True)),
+    'composite-rgb':        (bench_composite_rgb, dict()),
+    'composite-lut':        (bench_composite_rgb, dict(lut=True)),
+    'single-image':         (bench_single_image, dict()),
+    'timeseries':           (bench_timeseries, dict(retained=False)),
+    'timeseries-retained':  (bench_timeseries, dict(retained=True)),
+    'static-montage':       (bench_static_montage, dict(workers=1)),
+    'static-montage-pool':  (bench_static_montage, dict()),
+    'cli-import':           (bench_cli_import, dict()),
+}
+
+
+def _run_isolated(name: str, cfg_path: Path, out: Path, kwargs: Dict) -> Dict:
+    fn, defaults = BENCHMARKS[name]
+    res = fn(cfg_path, out, **{**defaults, **kwargs})
+    # peak resident memory of this process and of the processes it spawned (in kB on Linux)
+    rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                 resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    res.update({
+        'fps':         res['frames'] / res['seconds'],
+        'mb_s':        res['bytes'] / 1024 ** 2 / res['seconds'],
+        'peak_rss_mb': rss_kb / 1024 if sys.platform != 'darwin' else rss_kb / 1024 ** 2,
+    })
+    return res
+
+
+def _version() -> str:
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], text=True,
+                                       cwd=Path(__file__).parent).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown'
+
+
+def compare(current: Dict, previous: Dict) -> List[str]:
+    lines = [f"{'benchmark':<22}{'fps':>10}{'before':>10}{'ratio':>8}{'peak MB':>10}{'before':>10}"]
+    for name, res in current['results'].items():
+        prev = previous['results'].get(name)
+        if prev is None:
+            lines.append(f"{name:<22}{res['fps']:>10.2f}{'-':>10}{'-':>8}{res['peak_rss_mb']:>10.0f}{'-':>10}")
+            continue
+        lines.append(f"{name:<22}{res['fps']:>10.2f}{prev['fps']:>10.2f}{res['fps'] / prev['fps']:>8.2f}"
+                     f"{res['peak_rss_mb']:>10.0f}{prev['peak_rss_mb']:>10.0f}")
+    return lines
+
+
+@app.command()
+def main(
+        benchmarks: Annotated[
+            List[str], typer.Option("--benchmark", "-b", help="Benchmarks to run (all by default)")] = None,
+        frames: Annotated[int, typer.Option(help="Number of frames of the synthetic stack")] = 10,
+        channels: Annotated[int, typer.Option(help="Number of channels of the synthetic stack")] = 2,
+        zstacks: Annotated[int, typer.Option(help="Number of z planes of the synthetic stack")] = 5,
+        size: Annotated[int, typer.Option(help="Width and height of the planes of the synthetic stack")] = 512,
+        workers: Annotated[int, typer.Option(help="Number of processes of the parallel renderer")] = 4,
+        compare_to: Annotated[
+            Path, typer.Option("--compare", help="Results of a previous run to compare against")] = None,
+        save: Annotated[bool, typer.Option(help="Store the results in the results folder")] = True,
+):
+    names = benchmarks if benchmarks else list(BENCHMARKS)
+    params = dict(frames=frames, channels=channels, zstacks=zstacks, height=size, width=size)
+
+    results = dict()
+    with tempfile.TemporaryDirectory(prefix='movierender-benchmark-') as tmp:
+        tmp = Path(tmp)
+        typer.echo(f"Writing synthetic stack {params} into {tmp}")
+        cfg_path = make_dataset(tmp, **params)
+        for name in names:
+            # benchmarks taking a number of workers run with the one given, unless they set their own
+            fn, defaults = BENCHMARKS[name]
+            takes_workers = 'workers' in inspect.signature(fn).parameters and 'workers' not in defaults
+            kwargs = dict(workers=workers) if takes_workers else dict()
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                res = executor.submit(_run_isolated, name, cfg_path, tmp, kwargs).result()
+            typer.echo(f"{name:<22} {res['fps']:8.2f} frames/s {res['mb_s']:9.1f} MB/s "
+                       f"{res['peak_rss_mb']:8.0f} MB peak RSS")
+            results[name] = res
+
+    report = {
+        'version':   _version(),
+        'date':      datetime.now().isoformat(timespec='seconds'),
+        'machine':   {'platform': platform.platform(), 'python': platform.python_version(),
+                      'cpus': multiprocessing.cpu_count()},
+        'dataset':   params,
+        'results':   results,
+    }
+    if save:
+        RESULTS_FOLDER.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_FOLDER / f"{report['date'].replace(':', '')}-{report['version']}.json"
+        path.write_text(json.dumps(report, indent=1))
+        typer.echo(f"Results stored in {path}")
+    if compare_to is not None:
+        typer.echo("\n".join(compare(report, json.loads(Path(compare_to).read_text()))))
+
+
+if __name__ == "__main__":
+    app()
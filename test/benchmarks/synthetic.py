@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import numpy as np
+from fileops.image import ImageFile
+from fileops.image.imagemeta import MetadataImage
+
+CONFIG = """[DATA]
+image = ./stack.npy
+use_loader_class = test.benchmarks.synthetic.SyntheticImageFile
+frames = 0..{last_frame}
+channel = all
+
+[CHANNEL-1]
+name = green
+color = (1, 0, 1, 0)
+
+[CHANNEL-2]
+name = red
+color = (1, 1, 0, 0)
+
+[MOVIE-1]
+title = benchmark composite
+fps = 10
+layout = twoch-comp
+zstack_fn = all-max
+scalebar = 10
+filename = benchmark-comp
+
+[MOVIE-2]
+title = benchmark columns
+fps = 10
+layout = two-ch
+zstack_fn = all-max
+scalebar = 10
+filename = benchmark-col
+
+[PANEL-1]
+title = benchmark panel
+layout = all-frames
+columns = frames
+rows = channel
+zstack_fn = all-max
+filename = benchmark-panel.png
+"""
+
+
+def make_dataset(folder: Path, frames=10, channels=2, zstacks=5, height=512, width=512, seed=0) -> Path:
+    """
+    Write a stack of blurry spots on a noisy background as a TCZYX uint16 array along with a configuration file that
+    loads it with SyntheticImageFile, and return the path of the configuration file.
+    """
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    spots = rng.uniform(0, [height, width], size=(20, 2)).astype(np.float32)
+
+    stack = np.lib.format.open_memmap(folder / 'stack.npy', mode='w+', dtype=np.uint16,
+                                      shape=(frames, channels, zstacks, height, width))
+    for t in range(frames):
+        for c in range(channels):
+            plane = np.zeros((height, width), dtype=np.float32)
+            for y, x in spots + t * (c + 1):
+                plane += np.exp(-((yy - y % height) ** 2 + (xx - x % width) ** 2) / (2 * (width / 30) ** 2))
+            for z in range(zstacks):
+                focus = np.exp(-(z - zstacks / 2) ** 2 / zstacks)
+                stack[t, c, z] = 200 + 3000 * focus * plane + rng.integers(0, 200, size=plane.shape)
+    stack.flush()
+
+    cfg_path = folder / 'benchmark.cfg'
+    cfg_path.write_text(CONFIG.format(last_frame=frames - 1))
+    return cfg_path
+
+
+class SyntheticImageFile(ImageFile):
+    """
+    Image file of a TCZYX stack saved by numpy, read through a memory map.
+    """
+
+    def __init__(self, image_path: Path, **kwargs):
+        super().__init__(Path(image_path), **kwargs)
+
+    def _load_imageseries(self, series: int):
+        self._data = np.load(self.image_path, mmap_mode='r')
+        T, C, Z, Y, X = self._data.shape
+        self._md_n_frames, self._md_n_channels, self._md_n_zstacks = T, C, Z
+        self.n_frames, self.n_channels, self.n_zstacks = T, C, Z
+        self.frames = list(range(T))
+        self.channels = set(range(C))
+        self.zstacks = list(range(Z))
+        self.width, self.height = X, Y
+        self.um_per_pix, self.pix_per_um, self.um_per_z = 0.2, 5.0, 1.0
+        self.time_interval = 10
+        self.timestamps = [10 * t for t in self.frames]
+        for t in range(T):
+            for c in range(C):
+                for z in range(Z):
+                    czt = self.plane_at(c, z, t)
+                    self.all_planes_md_dict[czt] = len(self.all_planes)
+                    self.all_planes.append(czt)
+
+    def _image(self, plane, row=0, col=0, fid=0) -> MetadataImage:
+        c = int(plane[1:plane.index('z')])
+        z = int(plane[plane.index('z') + 1:plane.index('t')])
+        t = int(plane[plane.index('t') + 1:])
+        img = np.array(self._data[t, c, z])
+        return MetadataImage(reader='SyntheticImageFile', image=img,
+                             pix_per_um=self.pix_per_um, um_per_pix=self.um_per_pix,
+                             time_interval=self.time_interval, timestamp=10 * t,
+                             frame=t, channel=c, z=z, width=self.width, height=self.height,
+                             intensity_range=[img.min(), img.max()])
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from movierender.overlays import ImageHistogram
+
+
+class TestImageHistogram(TestCase):
+    def setUp(self):
+        self.image = np.random.default_rng(0).integers(0, 4096, size=(32, 48), dtype=np.uint16)
+
+    def plot(self, **kwargs):
+        ax = Figure().subplots()
+        ImageHistogram(ax=ax, bins=20, color='white').plot(**kwargs)
+        inset, = ax.child_axes
+        step, = inset.patches
+        return inset, step.get_path().vertices
+
+    def test_precomputed(self):
+        # histograms computed beforehand, e.g. by the workers preparing the tiles of a panel, are drawn the same
+        inset, from_image = self.plot(mdi=SimpleNamespace(image=self.image))
+        _, precomputed = self.plot(histogram=np.histogram(self.image.ravel(), bins=20))
+        np.testing.assert_array_equal(precomputed, from_image)
+
+        counts, edges = np.histogram(self.image.ravel(), bins=20)
+        self.assertGreaterEqual(inset.get_ylim()[1], counts.max())
+        self.assertEqual(from_image[:, 0].min(), edges[0])
+        self.assertEqual(from_image[:, 0].max(), edges[-1])
+
+    def test_bins(self):
+        # the bins given to the overlay are used unless given when plotting
+        _, vertices = self.plot(mdi=SimpleNamespace(image=self.image), bins=5)
+        self.assertEqual(len(np.unique(vertices[:, 0])), 5 + 1)
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+# modules of the rendering stack that shouldn't be loaded until a command runs
+HEAVY_MODULES = ['matplotlib', 'moviepy', 'skimage', 'scipy', 'pandas', 'fileops.image', 'movierender.render']
+
+
+def imported_modules(statement: str) -> set:
+    # every test imports in a fresh interpreter, as modules loaded by other tests would be cached in this one
+    out = subprocess.check_output([sys.executable, '-c', f"import sys\n{statement}\nprint(*sys.modules)"], text=True)
+    return set(out.split())
+
+
+class TestImports(TestCase):
+    def assertNotImported(self, statement: str):
+        modules = imported_modules(statement)
+        self.assertEqual([m for m in HEAVY_MODULES if m in modules], [])
+
+    def test_import_package(self):
+        self.assertNotImported("import movierender")
+
+    def test_import_cli(self):
+        self.assertNotImported("from movierender.scripts.render import app")
+
+    def test_cli_help(self):
+        self.assertNotImported("from typer.testing import CliRunner\n"
+                               "from movierender.scripts.render import app\n"
+                               "assert CliRunner().invoke(app, ['--help']).exit_code == 0")
+
+    def test_lazy_exports(self):
+        import movierender
+        from movierender.render import MovieRenderer
+
+        self.assertIs(movierender.MovieRenderer, MovieRenderer)
+        self.assertIn('MovieRenderer', dir(movierender))
+        with self.assertRaises(AttributeError):
+            _ = movierender.NotExported
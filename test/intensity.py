@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+import numpy as np
+
+from movierender.render.pipelines._intensity import fast_percentile, IntensityRange
+
+PERCENTILES = (0, 0.1, 2, 50, 99, 99.9, 100)
+
+
+def plane(dtype, seed=0, shape=(64, 80)):
+    rng = np.random.default_rng(seed)
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        return rng.integers(info.min, info.max, size=shape, endpoint=True, dtype=dtype)
+    return rng.normal(100, 20, size=shape).astype(dtype)
+
+
+class TestFastPercentile(TestCase):
+    def assertMatchesNumpy(self, img):
+        got = fast_percentile(img, PERCENTILES)
+        if np.issubdtype(img.dtype, np.integer) and img.dtype.itemsize <= 2:
+            # histograms give the value of the pixel at the rank of the percentile, without interpolating
+            np.testing.assert_array_equal(got, np.percentile(img, PERCENTILES, method='lower'))
+        else:
+            np.testing.assert_allclose(got, np.percentile(img, PERCENTILES))
+
+    def test_uint8(self):
+        self.assertMatchesNumpy(plane(np.uint8))
+
+    def test_uint16(self):
+        self.assertMatchesNumpy(plane(np.uint16))
+        # sparse values spread over the whole range of 16 bits
+        self.assertMatchesNumpy(np.array([0, 7, 7, 300, 65535] * 10, dtype=np.uint16))
+
+    def test_signed(self):
+        self.assertMatchesNumpy(plane(np.int8))
+        self.assertMatchesNumpy(plane(np.int16))
+        self.assertMatchesNumpy(plane(np.int32))
+
+    def test_float(self):
+        self.assertMatchesNumpy(plane(np.float32))
+        self.assertMatchesNumpy(plane(np.float64))
+
+    def test_constant(self):
+        for dtype, value in ((np.uint8, 0), (np.uint8, 255), (np.uint16, 1000), (np.int16, -5), (np.float32, 0.5)):
+            img = np.full((16, 16), value, dtype=dtype)
+            np.testing.assert_array_equal(fast_percentile(img, PERCENTILES), np.full(len(PERCENTILES), value))
+
+    def test_subsampled(self):
+        img = plane(np.float32, shape=(512, 512))
+        got = fast_percentile(img, (2, 50, 98), max_samples=10_000)
+        np.testing.assert_allclose(got, np.percentile(img, (2, 50, 98)), rtol=0.02)
+
+
+class TestIntensityRange(TestCase):
+    def test_frame(self):
+        rng = IntensityRange((2, 98), mode='frame')
+        for seed in range(3):
+            img = plane(np.uint16, seed)
+            self.assertEqual(rng(img), tuple(float(v) for v in fast_percentile(img, (2, 98))))
+
+    def test_integer_range_is_float(self):
+        lo, hi = IntensityRange((0, 100))(np.array([[0, 255]], dtype=np.uint8))
+        self.assertEqual((type(lo), type(hi)), (float, float))
+
+    def test_smooth(self):
+        rng = IntensityRange((0, 100), mode='smooth', window=2)
+        imgs = [np.array([[v, 10 * v]], dtype=np.uint16) for v in (1, 3, 5)]
+        self.assertEqual(rng(imgs[0]), (1.0, 10.0))
+        self.assertEqual(rng(imgs[1]), (2.0, 20.0))
+        # only the last window frames are averaged
+        self.assertEqual(rng(imgs[2]), (4.0, 40.0))
+
+    def test_movie(self):
+        imgs = [np.full((8, 8), v, dtype=np.uint16) for v in (10, 20, 30)]
+        rng = IntensityRange((0, 100), mode='movie').fit(imgs)
+        self.assertTrue(rng.fitted)
+        self.assertEqual(rng.range, (10.0, 30.0))
+        # the range is the same for every frame once fitted
+        self.assertEqual(rng(np.full((8, 8), 500, dtype=np.uint16)), (10.0, 30.0))
+
+    def test_movie_fits_first_frame(self):
+        rng = IntensityRange((0, 100), mode='movie')
+        self.assertFalse(rng.fitted)
+        self.assertEqual(rng(np.array([[4, 8]], dtype=np.uint8)), (4.0, 8.0))
+        self.assertEqual(rng(np.array([[0, 255]], dtype=np.uint8)), (4.0, 8.0))
+
+    def test_unsupported_mode(self):
+        with self.assertRaises(AssertionError):
+            IntensityRange(mode='global')
@@ -0,0 +1,107 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+import tifffile as tf
+
+from movierender.render.pipelines._memmap import PlaneMemmap, _locate_micromanager_page, _locate_ome_page
+
+
+class TifffileOMEImageFile:
+    # stands for the reader of fileops, as locators of pages are looked up by the name of the class
+    def __init__(self, path: Path, n_pages: int):
+        self.image_path = path
+        self.all_planes = [f"c0z0t{t}" for t in range(n_pages)]
+        self.all_planes_md_dict = {p: (t, 0, 0, t) for t, p in enumerate(self.all_planes)}
+
+
+class MicroManagerSingleImageStack:
+    def __init__(self, folder: Path, files, n_channels, n_zstacks, n_frames):
+        self.image_path = folder / files[0]
+        self.error_loading_metadata = False
+        self.n_channels, self.n_zstacks, self.n_frames = n_channels, n_zstacks, n_frames
+        self.files = files
+        self.frames_per_file = {f: files.count(f) for f in set(files)}
+        self.all_planes = [f"c{c}z{z}t{t}"
+                           for t in range(n_frames) for z in range(n_zstacks) for c in range(n_channels)]
+        self.all_planes_md_dict = {p: i for i, p in enumerate(self.all_planes)}
+
+
+def write_stack(path: Path, n_pages=3, seed=0, **kwargs) -> np.ndarray:
+    stack = np.random.default_rng(seed).integers(0, 4096, size=(n_pages, 16, 24), dtype=np.uint16)
+    with tf.TiffWriter(path) as tif:
+        for page in stack:
+            tif.write(page, contiguous=False, **kwargs)
+    return stack
+
+
+class TestPageLocators(TestCase):
+    def test_ome(self):
+        imf = TifffileOMEImageFile(Path('/data/stack.ome.tif'), n_pages=4)
+        self.assertEqual(_locate_ome_page(imf, 'c0z0t2'), (Path('/data/stack.ome.tif'), 2))
+
+    def test_micromanager(self):
+        # twelve planes spread over two files, the second one starting at the ninth plane
+        files = ['a.ome.tif'] * 8 + ['a_1.ome.tif'] * 4
+        imf = MicroManagerSingleImageStack(Path('/data'), files, n_channels=2, n_zstacks=2, n_frames=3)
+        self.assertEqual(_locate_micromanager_page(imf, 'c1z0t1'), (Path('/data/a.ome.tif'), 5))
+        self.assertEqual(_locate_micromanager_page(imf, 'c0z0t2'), (Path('/data/a_1.ome.tif'), 0))
+        self.assertEqual(_locate_micromanager_page(imf, 'c1z1t2'), (Path('/data/a_1.ome.tif'), 3))
+
+        imf.error_loading_metadata = True
+        self.assertIsNone(_locate_micromanager_page(imf, 'c0z0t0'))
+
+
+class TestPlaneMemmap(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self._tmp.name)
+        self.memmap = PlaneMemmap(max_files=2)
+
+    def tearDown(self):
+        self.memmap.clear()
+        self._tmp.cleanup()
+
+    def test_views(self):
+        stack = write_stack(self.folder / 'stack.tif')
+        imf = TifffileOMEImageFile(self.folder / 'stack.tif', n_pages=3)
+        for ix in range(3):
+            img = self.memmap.plane(imf, ix)
+            np.testing.assert_array_equal(img, stack[ix])
+            # planes are read-only views of the file rather than copies
+            self.assertFalse(img.flags.writeable)
+            self.assertIsInstance(img.base, np.memmap)
+
+    def test_not_mappable(self):
+        write_stack(self.folder / 'compressed.tif', compression='zlib')
+        imf = TifffileOMEImageFile(self.folder / 'compressed.tif', n_pages=3)
+        self.assertIsNone(self.memmap.plane(imf, 0))
+        self.assertIn((self.folder / 'compressed.tif', 0), self.memmap._unmappable)
+
+        # readers without a page locator are read by the image file
+        other = type('OtherImageFile', (TifffileOMEImageFile,), {})(self.folder / 'compressed.tif', n_pages=3)
+        self.assertIsNone(self.memmap.plane(other, 0))
+        self.assertIsNone(self.memmap.plane(imf, None))
+
+    def test_least_recently_used_files_closed(self):
+        image_files = list()
+        for name in ('a.tif', 'b.tif', 'c.tif'):
+            write_stack(self.folder / name)
+            image_files.append(TifffileOMEImageFile(self.folder / name, n_pages=3))
+
+        self.memmap.plane(image_files[0], 0)
+        self.memmap.plane(image_files[1], 0)
+        self.memmap.plane(image_files[0], 1)
+        self.memmap.plane(image_files[2], 0)
+        self.assertEqual(list(self.memmap._files), [self.folder / 'a.tif', self.folder / 'c.tif'])
+
+    def test_file_changed(self):
+        path = self.folder / 'stack.tif'
+        write_stack(path, seed=0)
+        imf = TifffileOMEImageFile(path, n_pages=3)
+        self.memmap.plane(imf, 0)
+
+        # files written again are mapped again
+        stack = write_stack(path, n_pages=4, seed=1)
+        np.testing.assert_array_equal(self.memmap.plane(imf, 0), stack[0])
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import numpy as np
+from fileops.export.config import read_config_panel
+from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from typer.testing import CliRunner
+
+from movierender.layouts import _static_panel, render_static_montage
+from movierender.layouts._static_panel import plan_panel, prepare_tiles
+from movierender.scripts.render import app
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class TestStaticPanel(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.cfg_path = make_dataset(Path(cls._tmp.name), frames=3, zstacks=3, height=32, width=40)
+        cls.panel = read_config_panel(cls.cfg_path)[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def test_plan(self):
+        plan = plan_panel(self.panel)
+        self.assertEqual(len(plan), 3 * 2)
+        self.assertEqual(sorted(zip(plan['frame'], plan['channel'])), [(f, c) for f in range(3) for c in range(2)])
+        self.assertTrue(np.all(plan['n_zstacks'] == 3))
+
+    def test_parallel_tiles_same_as_serial(self):
+        plan = plan_panel(self.panel)
+        keys = list(zip(plan['frame'], plan['channel']))
+        serial = prepare_tiles(self.panel, keys, workers=1)
+        # workers are bounded by the number of processors, which may be one on the machine running the tests
+        with mock.patch.object(os, 'cpu_count', return_value=2), \
+                self.assertLogs('movierender.layouts._static_panel', level='INFO') as logs:
+            parallel = prepare_tiles(self.panel, keys, workers=2)
+        self.assertIn("with 2 processes", logs.output[0])
+
+        self.assertEqual(list(serial), keys)
+        self.assertEqual(list(parallel), keys)
+        for key in keys:
+            self.assertEqual(parallel[key].frame, serial[key].frame)
+            self.assertEqual(parallel[key].channel, serial[key].channel)
+            self.assertEqual(serial[key].image.shape[:2], (32, 40))
+            np.testing.assert_array_equal(parallel[key].image, serial[key].image)
+
+    def test_command_workers(self):
+        result = CliRunner().invoke(app, ['panel', str(self.cfg_path), 'False', '--workers', '2'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertTrue((self.cfg_path.parent / 'benchmark-panel.png').exists())
+
+    def test_montage_requests(self):
+        requested = list()
+
+        def prepare(panel, keys, workers=1):
+            keys = list(keys)
+            requested.append(keys)
+            return prepare_tiles(panel, keys, workers=workers)
+
+        with mock.patch.object(_static_panel, 'prepare_tiles', prepare):
+            # one cell per frame and channel, each with the image of its tile prepared once
+            render_static_montage(self.panel, row='channel', col='frame')
+            # cells of several frames show no image, so there is nothing to prepare
+            render_static_montage(self.panel, row='channel')
+        self.assertEqual(sorted(requested[0]), [(f, c) for f in range(3) for c in range(2)])
+        self.assertEqual(requested[1], [])
+
+    def test_montage_grid(self):
+        n_figures = len(plt.get_fignums())
+        fig = render_static_montage(self.panel, row='channel', col='frame')
+
+        # figures are drawn by a canvas of their own, without pyplot
+        self.assertIsInstance(fig.canvas, FigureCanvasAgg)
+        self.assertEqual(len(plt.get_fignums()), n_figures)
+        self.assertTrue((self.cfg_path.parent / 'benchmark-panel.png').exists())
+
+        # a row per channel and a column per frame, titled by frame, each showing the image of its tile
+        self.assertEqual(len(fig.axes), 2 * 3)
+        grid = np.array(fig.axes).reshape(2, 3)
+        self.assertEqual([ax.get_title() for ax in grid[0]], ['0', '1', '2'])
+        tiles = prepare_tiles(self.panel, [(f, c) for f in range(3) for c in range(2)])
+        for (channel, frame), ax in np.ndenumerate(grid):
+            image, = ax.get_images()
+            np.testing.assert_array_equal(image.get_array(), tiles[(frame, channel)].image)
+            self.assertEqual(ax.get_subplotspec().get_geometry()[:2], (2, 3))
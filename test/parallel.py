@@ -0,0 +1,72 @@
+import tempfile
+from functools import partial
+from pathlib import Path
+from unittest import TestCase
+
+import imageio.v3 as iio
+import numpy as np
+from fileops.export.config import read_config_movie
+
+from movierender.layouts import LayoutCompositeComposer
+from movierender.render import ParallelMovieRenderer
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+ENCODER = dict(codec='ffv1')
+
+
+def _movie(cfg_path: Path):
+    return [m for m in read_config_movie(cfg_path) if m.header == 'MOVIE-1'][0]
+
+
+def _layout(cfg_path: Path, **kwargs):
+    # defined at module level, so that spawned workers import this module and the synthetic loader along with it
+    composer = LayoutCompositeComposer(_movie(cfg_path), overwrite=True, encoder=ENCODER, **kwargs)
+    composer.make_layout()
+    return composer.renderer
+
+
+class TestParallelMovieRenderer(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.cfg_path = make_dataset(Path(cls._tmp.name), frames=6, zstacks=2, height=64, width=64)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def render(self, prefix, **kwargs) -> np.ndarray:
+        composer = LayoutCompositeComposer(_movie(self.cfg_path), overwrite=True, prefix=prefix, encoder=ENCODER,
+                                           **kwargs)
+        composer.make_layout()
+        if isinstance(composer.renderer, ParallelMovieRenderer):
+            composer.renderer.layout_factory = partial(_layout, self.cfg_path)
+            composer.renderer.chunksize = 2
+            composer.renderer.min_frames_per_worker = 1
+        composer.render()
+        return iio.imread(composer.save_file_path)
+
+    def test_same_as_sequential(self):
+        sequential = self.render('seq-')
+        self.assertEqual(len(sequential), 6)
+        # spots move from frame to frame, so frames in the wrong order wouldn't match
+        self.assertTrue(all(np.any(a != b) for a, b in zip(sequential[:-1], sequential[1:])))
+
+        np.testing.assert_array_equal(self.render('proc-', workers=2), sequential)
+        np.testing.assert_array_equal(self.render('thread-', workers=2, threads=True), sequential)
+
+    def test_short_movie_sequential(self):
+        composer = LayoutCompositeComposer(_movie(self.cfg_path), overwrite=True, prefix='short-', workers=4,
+                                           encoder=ENCODER)
+        composer.make_layout()
+        renderer = composer.renderer
+        self.assertEqual(renderer._n_workers(6), 0)
+        self.assertEqual(renderer._n_workers(100), 4)
+
+        def no_executor(workers):
+            raise AssertionError("Processes started for a short movie.")
+
+        renderer._executor = no_executor
+        composer.render()
+        self.assertEqual(len(iio.imread(composer.save_file_path)), 6)
@@ -0,0 +1,114 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+from fileops.export.config import read_config_movie
+from matplotlib.figure import Figure
+
+from movierender import MovieRenderer
+from movierender.render import CompositeRGBImage, LUTCompositeImage
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class TestLUTCompositeImage(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cfg_path = make_dataset(Path(cls._tmp.name), frames=3, zstacks=2, height=64, width=96)
+        cls.mov = [m for m in read_config_movie(cfg_path) if m.header == 'MOVIE-1'][0]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def _pipeline(self, cls, **kwargs):
+        pipeline = cls(zstack=self.mov.zstack_fn, channeldict={
+            ch['name']: {'id': cix, 'color': ch['color'][1:], 'rescale': True, 'intensity': 1.0}
+            for cix, ch in self.mov.channel_render_parameters.items()}, **kwargs)
+        renderer = MovieRenderer(fig=Figure(), config=self.mov, prefetch_depth=0)
+        renderer += pipeline
+        return renderer, pipeline
+
+    def test_same_as_composite(self):
+        r_lut, lut = self._pipeline(LUTCompositeImage)
+        r_rgb, rgb = self._pipeline(CompositeRGBImage, output='uint8')
+        for fr in sorted(self.mov.frames):
+            r_lut.frame = r_rgb.frame = fr
+            img_lut, img_rgb = lut(), rgb()
+            self.assertEqual(img_lut.dtype, np.uint8)
+            self.assertEqual(img_lut.shape, img_rgb.shape)
+            # channels are rounded into uint8 before they are summed, so colors may be one level apart
+            np.testing.assert_allclose(img_lut, img_rgb, atol=1)
+
+    def test_float_planes_read_once(self):
+        r_lut, lut = self._pipeline(LUTCompositeImage)
+        r_rgb, rgb = self._pipeline(CompositeRGBImage, output='uint8')
+        reads = list()
+
+        def as_float(pipeline, log=None):
+            read = pipeline._plane
+
+            def _plane(channel, zstack=None):
+                if log is not None:
+                    log.append(channel)
+                return read(channel, zstack).astype(np.float32) / 4000
+
+            pipeline._plane = _plane
+
+        as_float(lut, log=reads)
+        as_float(rgb)
+        r_lut.frame = r_rgb.frame = 0
+        img_lut = lut()
+        self.assertEqual(len(reads), len(self.mov.channel_render_parameters))
+        np.testing.assert_array_equal(img_lut, rgb())
+
+
+class TestCompositeRGBImage(TestCase):
+    channeldict = {
+        'green': {'id': 0, 'color': (0, 1, 0), 'rescale': False, 'intensity': 1.0},
+        'magenta': {'id': 1, 'color': (1, 0, 1), 'rescale': {'range': (100, 3100)}, 'intensity': 0.5},
+    }
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.planes = [rng.integers(0, 4000, size=(24, 32), dtype=np.uint16) for _ in self.channeldict]
+
+    def reference(self, planes):
+        # channels stretched into [0, 1], colored and added one at a time
+        ranges = [(0, 65535), (100, 3100)]
+        rgb = np.zeros(planes[0].shape + (3,))
+        for img, (mini, maxi), settings in zip(planes, ranges, self.channeldict.values()):
+            gray = np.clip((img.astype(float) - mini) / (maxi - mini), 0, 1)
+            rgb += gray[:, :, np.newaxis] * np.asarray(settings['color']) * settings['intensity']
+        return np.clip(rgb, 0, 1)
+
+    def test_float(self):
+        pipeline = CompositeRGBImage(channeldict=self.channeldict)
+        img = pipeline._composite(self.planes, self.channeldict)
+        self.assertEqual(img.dtype, np.float32)
+        np.testing.assert_allclose(img, self.reference(self.planes), atol=1e-6)
+
+    def test_uint8(self):
+        pipeline = CompositeRGBImage(channeldict=self.channeldict, output='uint8')
+        img = pipeline._composite(self.planes, self.channeldict)
+        self.assertEqual(img.dtype, np.uint8)
+        np.testing.assert_array_equal(img, np.round(self.reference(self.planes) * 255))
+
+    def test_saturates(self):
+        # channels adding up past white saturate rather than wrap around
+        planes = [np.full((4, 4), 65535, dtype=np.uint16), np.full((4, 4), 4000, dtype=np.uint16)]
+        img = CompositeRGBImage(channeldict=self.channeldict, output='uint8')._composite(planes, self.channeldict)
+        np.testing.assert_array_equal(img[0, 0], (128, 255, 128))
+
+    def test_buffers_reused(self):
+        pipeline = CompositeRGBImage(channeldict=self.channeldict)
+        first = pipeline._composite(self.planes, self.channeldict)
+        expected = self.reference(self.planes[::-1])
+        self.assertIs(pipeline._composite(self.planes[::-1], self.channeldict), first)
+        np.testing.assert_allclose(first, expected, atol=1e-6)
+
+        # buffers follow the size of the planes
+        smaller = [p[:8, :8] for p in self.planes]
+        self.assertEqual(pipeline._composite(smaller, self.channeldict).shape, (8, 8, 3))
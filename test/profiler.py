@@ -0,0 +1,96 @@
+import json
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from fileops.export.config import read_config_movie
+
+from movierender.layouts import LayoutCompositeComposer
+from movierender.render import Profiler
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+def profile(profiler: Profiler, frames=(0, 1)):
+    for fr in frames:
+        with profiler.frame(fr):
+            with profiler.stage("pipeline"):
+                with profiler.stage("read"):
+                    buffer = np.ones(1024 ** 2, dtype=np.uint8)
+                time.sleep(0.01)
+            del buffer
+        # stages out of frames are recorded for the frame given
+        with profiler.stage("encode", frame=fr):
+            pass
+
+
+class TestProfiler(TestCase):
+    def test_records(self):
+        profiler = Profiler()
+        profile(profiler)
+        df = profiler.dataframe()
+        self.assertEqual(list(df['stage']), ['read', 'pipeline', 'frame', 'encode'] * 2)
+        self.assertEqual(list(df['frame']), [0] * 4 + [1] * 4)
+
+        frames = df[df['stage'] == 'frame'].set_index('frame')
+        pipeline = df[df['stage'] == 'pipeline'].set_index('frame')
+        # nested stages take part of the time of the stages around them
+        self.assertTrue(np.all(frames['seconds'] >= pipeline['seconds']))
+        self.assertTrue(np.all(pipeline['seconds'] >= 0.01))
+        # memory is traced per frame, and the buffer allocated while rendering it is part of the peak
+        self.assertTrue(np.all(frames['peak_bytes'] >= 1024 ** 2))
+        self.assertTrue(df.loc[df['stage'] != 'frame', 'peak_bytes'].isna().all())
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+        profile(profiler)
+        self.assertEqual(len(profiler.records), 0)
+
+    def test_take_records(self):
+        worker, renderer = Profiler(), Profiler()
+        profile(worker, frames=(3,))
+        renderer.extend(worker.take_records())
+        self.assertEqual(len(worker.records), 0)
+        self.assertEqual(set(renderer.dataframe()['frame']), {3})
+
+    def test_write_csv(self):
+        profiler = Profiler()
+        profile(profiler)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'movie.profile.csv'
+            profiler.write(path)
+            df = pd.read_csv(path)
+        self.assertEqual(list(df.columns), ['frame', 'stage', 'seconds', 'peak_bytes'])
+        self.assertEqual(len(df), 8)
+        np.testing.assert_allclose(df['seconds'], profiler.dataframe()['seconds'])
+
+    def test_write_json(self):
+        profiler = Profiler()
+        profile(profiler)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'movie.profile.json'
+            profiler.write(path)
+            with open(path) as f:
+                report = json.load(f)
+        self.assertEqual(len(report['records']), 8)
+        self.assertEqual(set(report['summary']), {'frame', 'pipeline', 'read', 'encode'})
+        self.assertEqual(report['summary']['frame']['calls'], 2)
+        self.assertAlmostEqual(report['summary']['frame']['share'], 1)
+        self.assertGreater(report['summary']['frame']['peak_mb'], 1)
+
+
+class TestProfiledMovie(TestCase):
+    def test_profile_next_to_movie(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg_path = make_dataset(Path(tmp), frames=3, zstacks=2, height=32, width=32)
+            movie = [m for m in read_config_movie(cfg_path) if m.header == 'MOVIE-1'][0]
+            composer = LayoutCompositeComposer(movie, overwrite=True, profile='csv', encoder=dict(codec='ffv1'))
+            composer.make_layout()
+            composer.render()
+
+            df = pd.read_csv(composer.save_file_path.with_name(f"{composer.filename}.profile.csv"))
+        self.assertEqual(sorted(df.loc[df['stage'] == 'frame', 'frame']), [0, 1, 2])
+        self.assertLessEqual({'read', 'draw', 'pipeline:CompositeRGBImage', 'overlay:ScaleBar'}, set(df['stage']))
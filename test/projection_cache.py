@@ -0,0 +1,64 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import numpy as np
+from fileops.export.config import read_config_movie
+
+from movierender.render.pipelines import ProjectionCache, z_projection
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class TestProjectionCache(TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self._tmp.name)
+        cfg_path = make_dataset(self.folder, frames=3, zstacks=3, height=16, width=12)
+        self.imf = read_config_movie(cfg_path)[0].image_file
+        self.plane_bytes = z_projection(self.imf, 0, 0, 'all-max').nbytes
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_hits(self):
+        cache = ProjectionCache()
+        img = cache.get(self.imf, 1, 0, 'all-max')
+        np.testing.assert_array_equal(img, z_projection(self.imf, 1, 0, 'all-max'))
+        self.assertIs(cache.get(self.imf, 1, 0, 'all-max'), img)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # projections of other kinds or over other planes are kept apart
+        cache.get(self.imf, 1, 0, 'all-min')
+        cache.get(self.imf, 1, 0, '0..1-max')
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        self.assertEqual(cache.nbytes, 3 * self.plane_bytes)
+
+    def test_least_recently_used_evicted(self):
+        cache = ProjectionCache(max_bytes=2 * self.plane_bytes)
+        cache.get(self.imf, 0, 0)
+        cache.get(self.imf, 0, 1)
+        cache.get(self.imf, 0, 0)
+        cache.get(self.imf, 1, 0)
+        self.assertEqual([key[2:4] for key in cache._cache], [(0, 0), (1, 0)])
+        self.assertEqual(cache.nbytes, 2 * self.plane_bytes)
+
+        cache.clear()
+        self.assertEqual((len(cache._cache), cache.nbytes), (0, 0))
+
+    def test_folder(self):
+        folder = self.folder / 'projections'
+        img = ProjectionCache(folder=folder).get(self.imf, 2, 1, 'all-mean')
+        self.assertEqual(len(list(folder.glob('*.npy'))), 1)
+
+        # a cache of another process reads the projection back from the folder instead of projecting again
+        with mock.patch('movierender.render.pipelines._projection_cache.z_projection') as projection:
+            np.testing.assert_array_equal(ProjectionCache(folder=folder).get(self.imf, 2, 1, 'all-mean'), img)
+            projection.assert_not_called()
+
+        # files written since are projected again
+        st = os.stat(self.imf.image_path)
+        os.utime(self.imf.image_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        ProjectionCache(folder=folder).get(self.imf, 2, 1, 'all-mean')
+        self.assertEqual(len(list(folder.glob('*.npy'))), 2)
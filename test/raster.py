@@ -0,0 +1,69 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import imageio.v3 as iio
+import numpy as np
+from fileops.export.config import read_config_movie
+
+from movierender.layouts import LayoutColumnComposer, LayoutCompositeComposer
+from movierender.overlays import Overlay
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+ENCODER = dict(codec='ffv1')
+
+
+class Marker(Overlay):
+    def plot(self, ax=None, **kwargs):
+        (self.ax if ax is None else ax).plot([0], [0], 'o')
+
+
+class TestRasterBackend(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.cfg_path = make_dataset(Path(cls._tmp.name), frames=3, zstacks=2, height=64, width=48)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def composer(self, header, **kwargs):
+        movie = [m for m in read_config_movie(self.cfg_path) if m.header == header][0]
+        composer_class = LayoutColumnComposer if movie.layout == 'two-ch' else LayoutCompositeComposer
+        composer = composer_class(movie, overwrite=True, backend='raster', encoder=ENCODER, **kwargs)
+        composer.make_layout()
+        return composer
+
+    def test_frame(self):
+        composer = self.composer('MOVIE-1')
+        renderer = composer.renderer
+        renderer.render_frame(1)
+        frame = renderer.frame_rgb()
+
+        tile = renderer.tiles[0]
+        self.assertEqual((tile.height, tile.width), (64, 48))
+        self.assertEqual(frame.dtype, np.uint8)
+        self.assertEqual(frame.shape[2], 3)
+        # the tile is a view of the frame, with the image and the white scale bar and timestamp drawn into it
+        self.assertTrue(np.shares_memory(tile.image, frame))
+        self.assertTrue(np.any(tile.image != 0))
+        self.assertTrue(np.any(np.all(tile.image == 255, axis=2)))
+        # the margins around the tile are left white
+        self.assertTrue(np.all(frame[0] == 255))
+
+    def test_movie(self):
+        composer = self.composer('MOVIE-2', columns=2)
+        self.assertEqual(len(composer.renderer.tiles), 2)
+        composer.render()
+        movie = iio.imread(composer.save_file_path)
+        self.assertEqual(len(movie), 3)
+        np.testing.assert_array_equal(movie[-1], composer.renderer.frame_rgb())
+
+    def test_unsupported_overlay(self):
+        composer = self.composer('MOVIE-1', prefix='unsupported-')
+        composer.renderer += Marker(ax=composer.renderer.tiles[0])
+        with self.assertRaisesRegex(ValueError, "Marker"):
+            composer.render()
+        self.assertFalse(composer.save_file_path.exists())
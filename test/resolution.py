@@ -0,0 +1,81 @@
+import math
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from fileops.export.config import read_config_movie
+
+from movierender.layouts import LayoutColumnComposer, LayoutCompositeComposer
+from movierender.layouts._base_composer import RESOLUTIONS
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class TestResolution(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.cfg_path = make_dataset(Path(cls._tmp.name), frames=2, zstacks=1, height=1024, width=1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def composer(self, header, resolution, **kwargs):
+        movie = [m for m in read_config_movie(self.cfg_path) if m.header == header][0]
+        composer_class = LayoutColumnComposer if movie.layout == 'two-ch' else LayoutCompositeComposer
+        composer = composer_class(movie, overwrite=True, resolution=resolution, **kwargs)
+        composer.make_layout()
+        return composer
+
+    def drawn_px(self, composer):
+        # side in pixels of the images drawn in the smallest axes of the layout, as they keep their aspect ratio
+        fig = composer.renderer.fig
+        return min(min(ax.get_position().width * fig.get_figwidth(), ax.get_position().height * fig.get_figheight())
+                   for ax in composer.ax_lst) * fig.dpi
+
+    def test_composite(self):
+        # the figure is 5x5.5 inches, with axes of 3.875x4.235 inches given by the default margins of figures
+        expected = {
+            None:    (326, 1),
+            '720p':  (130, 2),  # 720 / 5.5 dpi, and 1024 pixels drawn in 3.875 * 130 = 503.75
+            '1080p': (196, 1),  # 1080 / 5.5 dpi, and 1024 pixels drawn in 3.875 * 196 = 759.5
+            'native': (265, 1),  # 1024 / 3.875 = 264.3 dpi, rounded up
+        }
+        for resolution, (dpi, downsample) in expected.items():
+            composer = self.composer('MOVIE-1', resolution)
+            self.assertEqual(composer.renderer.fig.dpi, dpi, resolution)
+            self.assertEqual(composer.downsample, downsample, resolution)
+            self.assertEqual(composer.renderer.image_pipeline[0].downsample, downsample, resolution)
+
+    def test_fits_resolution(self):
+        for resolution, (width, height) in RESOLUTIONS.items():
+            for columns in (1, 2):
+                composer = self.composer('MOVIE-2', resolution, columns=columns)
+                fig_w, fig_h = composer.renderer.fig.get_size_inches() * composer.renderer.fig.dpi
+                self.assertLessEqual(fig_w, width)
+                self.assertLessEqual(fig_h, height)
+                # planes are downsampled as much as possible while keeping as many pixels as they are drawn with
+                drawn = self.drawn_px(composer)
+                self.assertGreaterEqual(1024 / composer.downsample, min(drawn, 1024))
+                self.assertLess(1024 / (composer.downsample + 1), drawn)
+
+    def test_native(self):
+        for columns in (1, 2):
+            composer = self.composer('MOVIE-2', 'native', columns=columns)
+            # the smallest dpi with at least one pixel of the movie per pixel of the images
+            dpi = composer.renderer.fig.dpi
+            self.assertGreaterEqual(self.drawn_px(composer), 1024)
+            self.assertLess(self.drawn_px(composer) / dpi * (dpi - 1), 1024)
+            self.assertEqual(composer.downsample, 1)
+
+    def test_rows(self):
+        # channels laid out in a single column take a row each, so their axes are half as tall
+        one_column = self.composer('MOVIE-2', '1080p', columns=1)
+        two_columns = self.composer('MOVIE-2', '1080p', columns=2)
+        self.assertEqual(len(one_column.ax_lst), 2)
+        positions = [ax.get_position() for ax in one_column.ax_lst]
+        self.assertGreater(positions[0].y0, positions[1].y1 - 1e-6)
+        self.assertTrue(math.isclose(positions[0].x0, positions[1].x0))
+        self.assertLess(self.drawn_px(one_column) / one_column.renderer.fig.dpi,
+                        self.drawn_px(two_columns) / two_columns.renderer.fig.dpi)
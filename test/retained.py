@@ -0,0 +1,81 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+from fileops.export.config import read_config_movie
+from matplotlib.patches import Rectangle
+
+from movierender.layouts import LayoutColumnComposer, LayoutCompositeComposer
+from movierender.overlays import Overlay
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class Box(Overlay):
+    dynamic = False
+
+    def plot(self, ax=None, **kwargs):
+        ax = self.ax if ax is None else ax
+        ax.add_patch(Rectangle((0.3, 0.3), 0.4, 0.4, transform=ax.transAxes, color='yellow', lw=4,
+                               zorder=self._kwargs['zorder']))
+
+
+class MovingLine(Overlay):
+    # crosses the box only in some frames
+    def plot(self, ax=None, **kwargs):
+        ax = self.ax if ax is None else ax
+        x = 0.1 + 0.25 * self._renderer.frame
+        ax.plot([x, x], [0.1, 0.9], transform=ax.transAxes, color='magenta', lw=3, zorder=10)
+
+
+class TestRetainedRendering(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.cfg_path = make_dataset(Path(cls._tmp.name), frames=4, zstacks=2, height=64, width=64)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def render(self, header, retained, overlays=(), **kwargs) -> np.ndarray:
+        movie = [m for m in read_config_movie(self.cfg_path) if m.header == header][0]
+        composer_class = LayoutColumnComposer if movie.layout == 'two-ch' else LayoutCompositeComposer
+        composer = composer_class(movie, overwrite=True, retained=retained, **kwargs)
+        composer.make_layout()
+        renderer = composer.renderer
+        for make_overlay in overlays:
+            renderer += make_overlay(composer.ax_lst[0])
+
+        frames = list()
+        for frame in sorted(movie.frames):
+            renderer.render_frame(frame)
+            frames.append(renderer.frame_rgb().copy())
+        return np.stack(frames)
+
+    def assertSameFrames(self, retained, immediate):
+        # static layers are cached with their alpha and blended onto every frame, which can round anti-aliased pixels
+        # to the next level
+        self.assertEqual(retained.shape, immediate.shape)
+        np.testing.assert_allclose(retained.astype(int), immediate.astype(int), rtol=0, atol=1)
+
+    def test_layouts(self):
+        self.assertSameFrames(self.render('MOVIE-1', True), self.render('MOVIE-1', False))
+        self.assertSameFrames(self.render('MOVIE-2', True, columns=2), self.render('MOVIE-2', False, columns=2))
+
+    def test_static_overlay_under_dynamic_one(self):
+        # a box drawn over the image and underneath a line that moves across it, or on top of the line
+        for zorder in (5, 50):
+            overlays = [lambda ax: Box(ax=ax, zorder=zorder), lambda ax: MovingLine(ax=ax)]
+            retained = self.render('MOVIE-1', True, overlays=overlays)
+            immediate = self.render('MOVIE-1', False, overlays=overlays)
+            # the line is over the box in some frames only
+            self.assertTrue(np.any(retained[1] != retained[0]))
+            self.assertSameFrames(retained, immediate)
+
+    def test_not_retained_by_default(self):
+        movie = [m for m in read_config_movie(self.cfg_path) if m.header == 'MOVIE-1'][0]
+        composer = LayoutCompositeComposer(movie, overwrite=True)
+        composer.make_layout()
+        self.assertFalse(composer.renderer.retained)
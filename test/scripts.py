@@ -0,0 +1,44 @@
+import inspect
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from typer.testing import CliRunner
+
+from movierender.scripts._options import render_options
+from movierender.scripts._render_configfile import render_configuration_file_cmd
+from movierender.scripts._render_folder import render_folder_cmd
+from movierender.scripts._render_movie import render_movie, render_movie_cmd
+from movierender.scripts.render import app
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+class TestRenderOptions(TestCase):
+    def test_encoder(self):
+        options = render_options(workers=2, codec='ffv1', crf=0, encoder_threads=3)
+        self.assertEqual(options['workers'], 2)
+        self.assertEqual(options['encoder'], dict(codec='ffv1', preset=None, crf=0, bitrate=None, threads=3, gop=None))
+
+    def test_render_movie_arguments(self):
+        # every option is an argument of render_movie
+        self.assertLessEqual(set(render_options()), set(inspect.signature(render_movie).parameters))
+
+    def test_same_options_in_every_command(self):
+        names = set(inspect.signature(render_options).parameters)
+        for cmd in (render_movie_cmd, render_configuration_file_cmd, render_folder_cmd):
+            params = inspect.signature(cmd).parameters
+            self.assertLessEqual(names, set(params), cmd.__name__)
+            for name in names:
+                # options are declared once, so that their help and type don't drift between commands
+                self.assertIs(params[name].annotation, inspect.signature(render_movie_cmd).parameters[name].annotation)
+
+
+class TestFileCommand(TestCase):
+    def test_frames(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg_path = make_dataset(Path(tmp), frames=4, zstacks=2, height=64, width=64)
+            result = CliRunner().invoke(app, ['file', str(cfg_path), 'False', '--codec', 'ffv1', '--frames', '1:3'])
+            self.assertEqual(result.exit_code, 0, result.output)
+            names = sorted(p.name for p in Path(tmp).glob('*.mkv'))
+            self.assertEqual(names, ['benchmark-col.f00001-00002.mkv', 'benchmark-comp.f00001-00002.mkv'])
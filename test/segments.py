@@ -0,0 +1,116 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import imageio.v3 as iio
+import numpy as np
+from typer.testing import CliRunner
+
+from movierender.render import EncoderSettings, parse_frames, shard_frames, segment_filename
+from movierender.render._writer import MovieWriter
+from movierender.scripts.render import app
+
+
+class TestParseFrames(TestCase):
+    frames = list(range(3, 20))
+
+    def test_range(self):
+        self.assertEqual(parse_frames(self.frames, "5:8"), [5, 6, 7])
+
+    def test_open_ended(self):
+        self.assertEqual(parse_frames(self.frames, ":6"), [3, 4, 5])
+        self.assertEqual(parse_frames(self.frames, "17:"), [17, 18, 19])
+        self.assertEqual(parse_frames(self.frames, ":"), self.frames)
+
+    def test_unsorted_frames(self):
+        self.assertEqual(parse_frames([9, 1, 5, 3], "2:9"), [3, 5])
+
+    def test_malformed(self):
+        for spec in ("5", "a:b", "5-8", "1:2:3"):
+            with self.assertRaises(ValueError):
+                parse_frames(self.frames, spec)
+
+
+class TestShardFrames(TestCase):
+    def assertPartition(self, frames, count, gop=None):
+        shards = [shard_frames(frames, f"{i}/{count}", gop=gop) for i in range(count)]
+        self.assertEqual(sum(shards, []), sorted(frames))
+        return shards
+
+    def test_even(self):
+        shards = self.assertPartition(list(range(12)), 3)
+        self.assertEqual([len(s) for s in shards], [4, 4, 4])
+
+    def test_uneven_last_shard(self):
+        shards = self.assertPartition(list(range(13)), 3, gop=4)
+        self.assertEqual([(s[0], s[-1]) for s in shards], [(0, 3), (4, 7), (8, 12)])
+
+    def test_gop_boundaries(self):
+        shards = self.assertPartition(list(range(100, 200)), 3, gop=10)
+        self.assertEqual([len(s) for s in shards], [30, 40, 30])
+        # every shard but the last starts and ends on a keyframe interval
+        self.assertTrue(all((s[0] - 100) % 10 == 0 for s in shards))
+
+    def test_more_shards_than_frames(self):
+        shards = self.assertPartition([0, 1, 2], 5)
+        self.assertTrue(all(len(s) <= 1 for s in shards))
+        self.assertEqual(sum(len(s) > 0 for s in shards), 3)
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(ValueError):
+            shard_frames(list(range(10)), "3/3")
+        with self.assertRaises(ValueError):
+            shard_frames(list(range(10)), "0/0")
+        with self.assertRaises(ValueError):
+            shard_frames(list(range(10)), "-1/3")
+
+    def test_segment_filename(self):
+        path = segment_filename(Path('/movies/cells.mp4'), [120, 7, 64])
+        self.assertEqual(path, Path('/movies/cells.f00007-00120.mp4'))
+        names = [segment_filename(Path('cells.mp4'), s).name for s in ([0, 9], [10, 99], [100, 250])]
+        self.assertEqual(sorted(names), names)
+
+
+class TestConcat(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.runner = CliRunner()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_segments(self, frames_per_segment=(3, 4, 2), ext='.mkv', **encoder):
+        segments, frames, fr = list(), list(), 0
+        for n in frames_per_segment:
+            path = segment_filename(self.folder / f"movie{ext}", list(range(fr, fr + n)))
+            with MovieWriter(path, fps=10, encoder=EncoderSettings(**encoder)) as writer:
+                for _ in range(n):
+                    img = np.full((32, 48, 3), 10 * fr, dtype=np.uint8)
+                    writer.write(img)
+                    frames.append(img)
+                    fr += 1
+            segments.append(path)
+        return segments, np.stack(frames)
+
+    def test_copy(self):
+        segments, frames = self.write_segments(codec='ffv1')
+        output = self.folder / 'movie.mkv'
+        result = self.runner.invoke(app, ['concat', *map(str, segments), '--output', str(output)])
+        self.assertEqual(result.exit_code, 0)
+        np.testing.assert_array_equal(iio.imread(output), frames)
+
+    def test_encode_again(self):
+        segments, frames = self.write_segments(codec='ffv1')
+        output = self.folder / 'movie.mp4'
+        result = self.runner.invoke(app, ['concat', *map(str, segments), '--output', str(output), '--crf', '0'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(iio.imread(output).shape, frames.shape)
+
+    def test_existing_output(self):
+        segments, _ = self.write_segments(frames_per_segment=(2, 2), codec='ffv1')
+        output = self.folder / 'movie.mkv'
+        output.write_bytes(b'')
+        result = self.runner.invoke(app, ['concat', *map(str, segments), '--output', str(output)])
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(output.stat().st_size, 0)
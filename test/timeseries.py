@@ -0,0 +1,96 @@
+import datetime
+import time
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from matplotlib import dates
+from matplotlib.figure import Figure
+
+from movierender.overlays import DataTimeseries
+
+
+def timeseries(n_frames=6, interval=90., t0=3500.) -> pd.DataFrame:
+    # two signals of two units, with rows out of order
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame([
+        {'unit': u, 'signal': s, 'frame': f, 'time': t0 + f * interval, 'value': rng.normal()}
+        for s in ('a', 'b') for u in (1, 2) for f in range(n_frames)
+    ])
+    return df.sample(frac=1, random_state=0)
+
+
+def lines(overlay: DataTimeseries):
+    return {key: np.asarray(line.get_xydata()) for key, line in overlay._lines.items()}
+
+
+class TestDataTimeseriesUpdate(TestCase):
+    def overlay(self, frame, **kwargs):
+        overlay = DataTimeseries(timeseries(), x='time', y='value', **kwargs)
+        overlay._renderer = SimpleNamespace(frame=frame)
+        return overlay, Figure().subplots()
+
+    def test_same_as_plot(self):
+        updated, ax = self.overlay(0)
+        updated.plot(ax=ax)
+        background = list(updated.background_artists())
+        for frame in range(1, 6):
+            updated._renderer.frame = frame
+            updated.update(ax=ax)
+            plotted, other_ax = self.overlay(frame)
+            plotted.plot(ax=other_ax)
+
+            self.assertEqual(lines(updated).keys(), lines(plotted).keys())
+            for key, xy in lines(plotted).items():
+                np.testing.assert_array_equal(lines(updated)[key], xy)
+                self.assertEqual(len(xy), frame + 1)
+            np.testing.assert_array_equal(updated._dots.get_offsets(), plotted._dots.get_offsets())
+            # lines of the whole series are drawn once and kept
+            self.assertEqual(updated.background_artists(), background)
+
+    def test_series(self):
+        overlay, ax = self.overlay(2)
+        overlay.plot(ax=ax)
+        # one gray line per unit and signal with the whole series, and the part up to the frame on top of it
+        self.assertEqual(len(overlay.background_artists()), 4)
+        self.assertEqual(sorted(overlay._lines), [(1, 'a'), (1, 'b'), (2, 'a'), (2, 'b')])
+        df = timeseries()
+        expected = df[(df['unit'] == 1) & (df['signal'] == 'b') & (df['frame'] <= 2)].sort_values('frame')
+        np.testing.assert_array_equal(lines(overlay)[(1, 'b')][:, 1], expected['value'].to_numpy())
+        self.assertEqual(len(overlay._dots.get_offsets()), 4 * 3)
+
+
+class TestDataTimeseriesTimes(TestCase):
+    def test_labels_same_as_strptime(self):
+        # times of the day as they were given by formatting and parsing each value, with fractions and past midnight
+        df = timeseries().assign(time=lambda d: d['time'] * 37.3)
+        expected = df['time'].map(lambda s: datetime.datetime.strptime(time.strftime('%H:%M:%S', time.gmtime(s)),
+                                                                        '%H:%M:%S'))
+        overlay = DataTimeseries(df, x='time', y='value')
+        self.assertGreater(df['time'].max(), 86400)
+        self.assertEqual(list(overlay.df['x'].sort_index()), list(pd.to_datetime(expected).sort_index()))
+
+    def test_hh_mm_axis(self):
+        overlay = DataTimeseries(timeseries(), x='time', y='value')
+        ax = Figure().subplots()
+        overlay.plot(ax=ax)
+        self.assertEqual(ax.get_xlabel(), "Time [hh:mm]")
+        self.assertIsInstance(ax.xaxis.get_major_formatter(), dates.DateFormatter)
+        # 3500 s after midnight, on the day strptime gives
+        x0 = dates.date2num(datetime.datetime(1900, 1, 1, 0, 58, 20))
+        self.assertAlmostEqual(min(line.get_xdata().min() for line in overlay.background_artists()), x0)
+
+    def test_seconds_axis(self):
+        df = timeseries()
+        overlay = DataTimeseries(df, x='time', y='value', time_axis='seconds')
+        ax = Figure().subplots()
+        overlay.plot(ax=ax)
+        self.assertEqual(ax.get_xlabel(), "Time [s]")
+        self.assertEqual(ax.get_xlim(), (df['time'].min(), df['time'].max()))
+        expected = df[(df['unit'] == 2) & (df['signal'] == 'a')].sort_values('frame')
+        np.testing.assert_array_equal(lines(overlay)[(2, 'a')], expected[['time', 'value']].to_numpy())
+
+    def test_time_axis_not_supported(self):
+        with self.assertRaises(AssertionError):
+            DataTimeseries(timeseries(), x='time', y='value', time_axis='minutes')
@@ -0,0 +1,96 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from fileops.export.config import read_config_movie
+
+from movierender.render import EncoderSettings, read_encoder_settings
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+def option(params, name):
+    return params[params.index(name) + 1] if name in params else None
+
+
+class TestEncoderSettings(TestCase):
+    def test_libx264(self):
+        params = EncoderSettings(crf=20, gop=50).ffmpeg_params()
+        self.assertEqual(option(params, '-pix_fmt'), 'yuv420p')
+        self.assertEqual(option(params, '-crf'), '20')
+        self.assertEqual(option(params, '-g'), '50')
+        self.assertEqual(option(params, '-vf'), 'pad=ceil(iw/2)*2:ceil(ih/2)*2')
+        self.assertNotIn('-tag:v', params)
+
+    def test_libx264_defaults(self):
+        enc = EncoderSettings(bitrate='4M')
+        params = enc.ffmpeg_params()
+        self.assertNotIn('-crf', params)
+        self.assertNotIn('-g', params)
+        self.assertEqual((enc.ffmpeg_bitrate, enc.ffmpeg_preset, enc.extension), ('4M', 'medium', '.mp4'))
+        # a constant rate factor takes precedence over the bitrate
+        self.assertIsNone(enc.updated(crf=23).ffmpeg_bitrate)
+
+    def test_libx265(self):
+        enc = EncoderSettings(codec='libx265', preset='fast', crf=26)
+        params = enc.ffmpeg_params()
+        self.assertEqual(option(params, '-tag:v'), 'hvc1')
+        self.assertEqual(option(params, '-crf'), '26')
+        self.assertEqual(enc.ffmpeg_preset, 'fast')
+
+    def test_libvpx_vp9(self):
+        enc = EncoderSettings(codec='libvpx-vp9', preset='ultrafast', crf=30)
+        params = enc.ffmpeg_params()
+        self.assertEqual(option(params, '-crf'), '30')
+        self.assertEqual(option(params, '-b:v'), '0')
+        self.assertEqual(option(params, '-deadline'), 'realtime')
+        self.assertEqual(option(params, '-cpu-used'), '8')
+        self.assertEqual(option(params, '-row-mt'), '1')
+        # only x264 and x265 take presets
+        self.assertEqual(enc.ffmpeg_preset, 'medium')
+        self.assertEqual(option(EncoderSettings(codec='libvpx-vp9').ffmpeg_params(), '-deadline'), 'good')
+
+    def test_ffv1(self):
+        enc = EncoderSettings(codec='ffv1', crf=20, bitrate='4M')
+        params = enc.ffmpeg_params()
+        self.assertEqual(option(params, '-pix_fmt'), 'bgr0')
+        self.assertEqual(option(params, '-level'), '3')
+        self.assertEqual(option(params, '-g'), '1')
+        self.assertNotIn('-crf', params)
+        self.assertIsNone(enc.ffmpeg_bitrate)
+        self.assertEqual(enc.extension, '.mkv')
+        self.assertEqual(option(enc.updated(gop=10).ffmpeg_params(), '-g'), '10')
+
+    def test_unsupported_codec(self):
+        with self.assertRaises(AssertionError):
+            EncoderSettings(codec='mpeg4').ffmpeg_params()
+
+
+class TestReadEncoderSettings(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cfg_path = make_dataset(Path(self.tmp.name), frames=2, channels=2, zstacks=1, height=16, width=16)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def movie(self, header='MOVIE-1'):
+        return [m for m in read_config_movie(self.cfg_path) if m.header == header][0]
+
+    def test_defaults(self):
+        mov = self.movie()
+        self.assertEqual(read_encoder_settings(mov), EncoderSettings(bitrate=mov.bitrate))
+
+    def test_movie_section(self):
+        cfg = self.cfg_path.read_text().replace("filename = benchmark-comp\n",
+                                                "filename = benchmark-comp\n"
+                                                "codec = libx265\npreset = fast\ncrf = 26\n"
+                                                "encoder_threads = 4\ngop = 50\n")
+        self.cfg_path.write_text(cfg)
+        enc = read_encoder_settings(self.movie())
+        self.assertEqual((enc.codec, enc.preset, enc.crf, enc.threads, enc.gop), ('libx265', 'fast', 26, 4, 50))
+        # settings of a section don't leak into the other movies of the file
+        self.assertEqual(read_encoder_settings(self.movie('MOVIE-2')).codec, 'libx264')
+        # settings given by the command line override those of the file
+        self.assertEqual(enc.updated(codec='ffv1', crf=None).crf, 26)
+        self.assertEqual(enc.updated(codec='ffv1', crf=None).codec, 'ffv1')
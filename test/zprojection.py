@@ -0,0 +1,95 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+from fileops.export.config import read_config_movie
+from fileops.image.exceptions import FrameNotFoundError
+from fileops.image.ops import ZProjection
+
+from movierender.render.pipelines import parse_projection, z_projection
+# loader classes of configuration files are looked up as attributes of their package, so the module has to be loaded
+from test.benchmarks.synthetic import make_dataset
+
+
+def image_file(folder: Path, zstacks: int):
+    cfg_path = make_dataset(folder, frames=2, zstacks=zstacks, height=16, width=12)
+    return read_config_movie(cfg_path)[0].image_file, np.load(folder / 'stack.npy')
+
+
+class TestParseProjection(TestCase):
+    def test_all_planes(self):
+        self.assertEqual(parse_projection('all-max'), (ZProjection.MAX, None))
+        self.assertEqual(parse_projection('all-std'), (ZProjection.STD, None))
+        self.assertEqual(parse_projection(None), (None, None))
+
+    def test_range(self):
+        # both ends of the range are included
+        self.assertEqual(parse_projection('3..12-max'), (ZProjection.MAX, range(3, 13)))
+        self.assertEqual(parse_projection('0..0-mean'), (ZProjection.MEAN, range(0, 1)))
+
+    def test_bad_range(self):
+        with self.assertRaises(ValueError):
+            parse_projection('12..3-max')
+        self.assertEqual(parse_projection('3..x-max')[0], ZProjection.UNSPECIFIED)
+
+
+class TestZProjection(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        cls.imf, cls.stack = image_file(Path(cls._tmp.name), zstacks=14)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmp.cleanup()
+
+    def assertProjects(self, projection, expected, planes=slice(None)):
+        for frame, channel in ((0, 0), (1, 1)):
+            got = z_projection(self.imf, frame, channel, projection=projection)
+            np.testing.assert_allclose(got, expected(self.stack[frame, channel, planes], axis=0))
+
+    def test_max(self):
+        self.assertProjects('all-max', np.max)
+        self.assertEqual(z_projection(self.imf, 0, 0, 'all-max').dtype, self.stack.dtype)
+
+    def test_min(self):
+        self.assertProjects('all-min', np.min)
+
+    def test_sum(self):
+        self.assertProjects('all-sum', np.sum)
+        # planes are added in an accumulator wide enough not to overflow
+        self.assertEqual(z_projection(self.imf, 0, 0, 'all-sum').dtype, np.sum(self.stack[0, 0], axis=0).dtype)
+
+    def test_mean(self):
+        self.assertProjects('all-mean', np.mean)
+
+    def test_std(self):
+        self.assertProjects('all-std', np.std)
+
+    def test_median(self):
+        self.assertProjects('all-median', np.median)
+
+    def test_range(self):
+        self.assertProjects('3..12-max', np.max, planes=slice(3, 13))
+        self.assertProjects('3..12-std', np.std, planes=slice(3, 13))
+
+    def test_range_outside_stack(self):
+        with self.assertRaises(FrameNotFoundError):
+            z_projection(self.imf, 0, 0, '20..30-max')
+
+    def test_unspecified(self):
+        with self.assertRaises(ValueError):
+            z_projection(self.imf, 0, 0, '3..x-max')
+
+
+class TestSinglePlane(TestCase):
+    def test_projections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            imf, stack = image_file(Path(tmp), zstacks=1)
+            plane = stack[1, 0, 0]
+            for projection in ('all-max', 'all-min', 'all-sum', 'all-mean', 'all-median', '0..0-max'):
+                np.testing.assert_array_equal(z_projection(imf, 1, 0, projection), plane, projection)
+            np.testing.assert_array_equal(z_projection(imf, 1, 0, 'all-std'), np.zeros_like(plane, dtype=float))
+            with self.assertRaises(FrameNotFoundError):
+                z_projection(imf, 1, 0, '1..3-max')